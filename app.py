@@ -1,13 +1,40 @@
 import os
-import numpy as np
-import pandas as pd
+import sys
+import json
+import time
+import threading
+import importlib
+import subprocess
 from flask import Flask, render_template, request, jsonify
-import joblib
-from sklearn.metrics import accuracy_score, recall_score, f1_score, classification_report
+from json_provider import FastJSONProvider
+from drift_monitor import DriftMonitor, DriftReference
+from singleflight import VersionedCache
+
+
+class LazyModule:
+    """延迟导入的模块代理：首次访问属性时才真正import（缩短进程启动时间）"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            STARTUP_TIMINGS[f"import_{self._name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return getattr(self._module, attr)
+
+
+# 启动/首次加载耗时记录（毫秒），写入启动报告
+STARTUP_TIMINGS = {}
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
 
 # ========== 基础配置 ==========
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False  # 解决中文乱码
+app.json = FastJSONProvider(app)  # orjson序列化（原生支持NumPy/pandas，输出中文原文）
 # 1. 文件路径（使用相对路径，自动适配不同环境）
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -21,6 +48,11 @@ FILE_PATHS = {
     "label_encoder": os.path.join(MODEL_DIR, "label_encoder_zgen.pkl"),
     "scaler": os.path.join(MODEL_DIR, "scaler_zgen.pkl")
 }
+# 模型同步：设置MODEL_SYNC_SOURCE（"oss"或本地Bucket目录）后，启动时从远端下载到内容寻址缓存并从缓存加载
+MODEL_SYNC_SOURCE = os.environ.get("MODEL_SYNC_SOURCE", "")
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(BASE_DIR, "model_cache"))
+# 启动报告（-X importtime 导入耗时 + 模型/数据加载耗时）
+STARTUP_REPORT_PATH = os.path.join(BASE_DIR, "startup_report.json")
 # 2. 客群映射配置（与模型训练时的标签一致）
 CUSTOMER_GROUP_MAP = {
     0: "基础通信客群（低价值）",
@@ -47,9 +79,7 @@ OPERATION_ADVICE = {
     4: "1. 短视频平台联名套餐；2. 社交裂变营销；3. 直播流量补贴",
     5: "1. 美妆/穿搭类权益包；2. 女性专属优惠；3. 商圈场景化营销"
 }
-# 3. 模型加载（增强容错，明确模型输入特征顺序）
-MODEL_LOADED = False
-model, label_encoder, scaler = None, None, None
+# 3. 模型加载（增强容错，明确模型输入特征顺序；首次使用时才反序列化，模型文件变化时重新加载）
 # 模型训练时的输入特征顺序（必须与预测时一致！请根据实际训练代码修改）
 MODEL_FEATURE_ORDER = [
     'AGE',  # 年龄（CSV中实际列名）
@@ -61,22 +91,89 @@ MODEL_FEATURE_ORDER = [
     'night_flux',  # 夜间流量
     'N3M_AVG_GAME_APP_USE_DAYS'  # 网游APP月均使用天数
 ]
-try:
-    # 加载模型组件
-    if os.path.exists(FILE_PATHS["model"]):
-        model = joblib.load(FILE_PATHS["model"])
-        print(f"✅ 模型文件加载成功（类型：{type(model)}）")
-    if os.path.exists(FILE_PATHS["label_encoder"]):
-        label_encoder = joblib.load(FILE_PATHS["label_encoder"])
-        print(f"✅ 标签编码器加载成功")
-    if os.path.exists(FILE_PATHS["scaler"]):
-        scaler = joblib.load(FILE_PATHS["scaler"])
-        print(f"✅ 标准化器加载成功")
+# 预测接口输入漂移监控（最近DRIFT_WINDOW次请求，与wutong.csv参考分布对比）
+DRIFT_WINDOW = int(os.environ.get("DRIFT_WINDOW", 10000))
+DRIFT_MONITOR = DriftMonitor(MODEL_FEATURE_ORDER, window=DRIFT_WINDOW)
+# 特征缺失时的默认值
+DEFAULT_FEATURE_VALUES = {'AGE': 23, 'INNET_DURA': 12, 'PRI_PACKAGE_FEE': 88, 'ACCT_BAL': 50,
+                          'N3M_AVG_DIS_ARPU': 90, 'day_flux': 5, 'night_flux': 2, 'N3M_AVG_GAME_APP_USE_DAYS': 5}
+_model_lock = threading.Lock()
+_model_sync_done = False
+
+
+def sync_model_cache():
+    """从MODEL_SYNC_SOURCE下载模型到本地缓存，并把FILE_PATHS中的模型路径指向缓存文件（只执行一次）
+    调用方须持有_model_lock；同步结束（成功或失败）后才标记完成，同步期间其他线程在锁上等待
+    """
+    global _model_sync_done
+    if _model_sync_done or not MODEL_SYNC_SOURCE:
+        return
+    start = time.perf_counter()
+    try:
+        from upload_models_to_oss import download_models, get_store
+        cached = download_models(get_store(MODEL_SYNC_SOURCE), cache_dir=MODEL_CACHE_DIR)
+        for key in ("model", "label_encoder", "scaler"):
+            name = os.path.basename(FILE_PATHS[key])
+            if name in cached:
+                FILE_PATHS[key] = cached[name]
+                print(f"✅ {name} 使用缓存：{cached[name]}")
+            else:
+                print(f"⚠️ 远端清单中无{name}，使用本地{FILE_PATHS[key]}")
+    except Exception as e:
+        print(f"❌ 模型同步失败，使用本地模型目录：{str(e)[:100]}")
+    STARTUP_TIMINGS["model_sync_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    _model_sync_done = True
+
+
+def model_files_version():
+    """模型组件文件的版本（修改时间+大小），任一文件变化时重新加载模型"""
+    version = []
+    for key in ("model", "label_encoder", "scaler"):
+        try:
+            stat = os.stat(FILE_PATHS[key])
+            version.append((os.path.basename(FILE_PATHS[key]), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append((key, None, None))
+    return tuple(version)
+
+
+def _load_model_components(version, previous):
+    """按文件版本加载模型组件，返回同一次加载的组件字典（调用方整体取用，不混用不同版本的组件）"""
+    start = time.perf_counter()
+    components = {"model": None, "label_encoder": None, "scaler": None}
+    try:
+        import joblib
+        # 加载模型组件
+        if os.path.exists(FILE_PATHS["model"]):
+            components["model"] = joblib.load(FILE_PATHS["model"])
+            print(f"✅ 模型文件加载成功（类型：{type(components['model'])}）")
+        if os.path.exists(FILE_PATHS["label_encoder"]):
+            components["label_encoder"] = joblib.load(FILE_PATHS["label_encoder"])
+            print(f"✅ 标签编码器加载成功")
+        if os.path.exists(FILE_PATHS["scaler"]):
+            components["scaler"] = joblib.load(FILE_PATHS["scaler"])
+            print(f"✅ 标准化器加载成功")
+    except Exception as e:
+        print(f"❌ 模型加载失败：{str(e)[:100]}")
     # 验证模型组件完整性
-    MODEL_LOADED = all([model is not None, label_encoder is not None, scaler is not None])
-    print(f"✅ 模型加载状态：{'完全成功' if MODEL_LOADED else '组件缺失'}")
-except Exception as e:
-    print(f"❌ 模型加载失败：{str(e)[:100]}")
+    loaded = all(value is not None for value in components.values())
+    print(f"✅ 模型加载状态：{'完全成功' if loaded else '组件缺失'}")
+    STARTUP_TIMINGS["model_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return {"version": version, "loaded": loaded, **components}
+
+
+# 同一模型文件版本只反序列化一次；文件更新后由后台线程重新加载，加载完成前继续使用旧模型
+_model_cache = VersionedCache("模型组件", _load_model_components, model_files_version)
+
+
+def get_model_bundle(fresh=False):
+    """当前模型组件：{"version", "loaded", "model", "label_encoder", "scaler"}（同一次加载的组件，版本一致）"""
+    if MODEL_SYNC_SOURCE and not _model_sync_done:
+        with _model_lock:
+            sync_model_cache()
+        # 同步后的首次加载同步进行：FILE_PATHS已指向缓存文件，不能继续返回同步前的组件
+        fresh = True
+    return _model_cache.get(allow_stale=not fresh)
 
 
 # ========== 工具函数 ==========
@@ -95,23 +192,127 @@ def get_real_features_from_csv(df):
             col = df.columns[clean_cols.index(feat_upper)]
         else:
             # 列缺失时用默认值
-            default_vals = {'AGE': 23, 'INNET_DURA': 12, 'PRI_PACKAGE_FEE': 88, 'ACCT_BAL': 50,
-                            'N3M_AVG_DIS_ARPU': 90, 'day_flux': 5, 'night_flux': 2, 'N3M_AVG_GAME_APP_USE_DAYS': 5}
-            features.append(default_vals[feat])
+            features.append(DEFAULT_FEATURE_VALUES[feat])
             continue
 
-        # 提取列值并转换为数值（处理缺失值）
-        df[col] = pd.to_numeric(df[col], errors='coerce')  # 无法转换的设为NaN
-        val = df[col].fillna(df[col].median()).iloc[0]  # 用中位数填充，取第一行作为示例（可根据需求修改）
+        # 提取列值并转换为数值（处理缺失值，不修改共享的DataFrame）
+        values = pd.to_numeric(df[col], errors='coerce')  # 无法转换的设为NaN
+        val = values.fillna(values.median()).iloc[0]  # 用中位数填充，取第一行作为示例（可根据需求修改）
         features.append(float(val))
     return features
 
 
-def read_csv_data():
-    """统一读取CSV数据的函数"""
+def parse_request_features(req):
+    """按MODEL_FEATURE_ORDER从请求参数中提取模型特征（键名不区分大小写，缺失或非数值时用默认值）
+    返回 (特征列表, 各特征是否使用了默认值)
+    """
+    req_keys = {key.strip().upper(): key for key in req.keys()}
+    features, defaulted = [], []
+    for feat in MODEL_FEATURE_ORDER:
+        # 从请求中提取参数，适配大小写（如age→AGE，pri_package_fee→PRI_PACKAGE_FEE）
+        req_key = req_keys.get(feat.upper())
+        # 提取值并转换为数值（无参数则用默认值）
+        is_default = False
+        if req_key:
+            try:
+                val = float(req[req_key])
+            except (ValueError, TypeError):
+                val, is_default = DEFAULT_FEATURE_VALUES[feat], True
+                print(f"⚠️ 请求参数{req_key}不是数值，使用默认值{val}")
+        else:
+            val, is_default = DEFAULT_FEATURE_VALUES[feat], True
+            print(f"⚠️ 请求中无{feat}参数，使用默认值{val}")
+        features.append(val)
+        defaulted.append(is_default)
+    return features, defaulted
+
+
+def build_feature_matrix(df):
+    """向量化提取全部用户的模型特征（列匹配规则同get_real_features_from_csv），返回 (用户数, 特征数) 的float64矩阵"""
+    clean_cols = [col.strip().upper() for col in df.columns]
+    matrix = np.empty((len(df), len(MODEL_FEATURE_ORDER)), dtype=np.float64)
+    for j, feat in enumerate(MODEL_FEATURE_ORDER):
+        feat_upper = feat.upper()
+        if feat_upper == 'N3M_AVG_DIS_ARPU' and 'PRI_PACKAGE_FEE' in clean_cols:
+            col = df.columns[clean_cols.index('PRI_PACKAGE_FEE')]
+        elif feat_upper in clean_cols:
+            col = df.columns[clean_cols.index(feat_upper)]
+        else:
+            matrix[:, j] = DEFAULT_FEATURE_VALUES[feat]
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        median = values.median()
+        matrix[:, j] = values.fillna(DEFAULT_FEATURE_VALUES[feat] if pd.isna(median) else median).to_numpy(dtype=np.float64)
+    return matrix
+
+
+def predict_groups(matrix, bundle=None):
+    """批量预测客群编码（bundle为get_model_bundle()返回的模型组件；模型未加载或预测失败时返回None）"""
+    bundle = bundle or get_model_bundle()
+    if len(matrix) == 0 or not bundle["loaded"]:
+        return None
+    try:
+        return np.asarray(bundle["model"].predict(bundle["scaler"].transform(matrix))).astype(np.int64)
+    except Exception as e:
+        print(f"⚠️ 批量预测失败：{str(e)[:100]}")
+        return None
+
+
+def assign_age_group(df, clean_cols):
+    """年龄分组（18-35岁截断，缺失值用中位数填充）；无AGE列或非数值时返回None"""
+    if 'AGE' not in clean_cols:
+        return None
+    ages = pd.to_numeric(df[df.columns[clean_cols.index('AGE')]], errors='coerce')
+    if ages.notna().sum() == 0:
+        return None
+    return pd.cut(
+        ages.fillna(ages.median()).clip(18, 35),  # 限制18-35岁（避免异常值）
+        bins=[18, 23, 26, 31, 36],
+        labels=["18-22岁", "23-25岁", "26-30岁", "30+岁"],
+        right=False
+    )
+
+
+def assign_consume_band(df, clean_cols):
+    """消费分档：优先N3M_AVG_DIS_ARPU，其次PRI_PACKAGE_FEE，最后用INNET_DURA推导；返回 (分档Series, 使用的列名)"""
+    consume_col = None
+    if 'N3M_AVG_DIS_ARPU' in clean_cols:
+        consume_col = df.columns[clean_cols.index('N3M_AVG_DIS_ARPU')]  # 优先用真实月均消费列
+    elif 'PRI_PACKAGE_FEE' in clean_cols:
+        consume_col = df.columns[clean_cols.index('PRI_PACKAGE_FEE')]  # 用主套餐费替代
+    elif 'INNET_DURA' in clean_cols:
+        consume_col = df.columns[clean_cols.index('INNET_DURA')]  # 备选：用在网时长推导
+    if consume_col is None:
+        return None, None
+    values = pd.to_numeric(df[consume_col], errors='coerce')
+    if values.notna().sum() == 0:
+        return None, consume_col
+    values = values.fillna(values.median())
+    labels = ["≤50元", "50-100元", "100-200元", "≥200元"]
+    if 'INNET_DURA' in consume_col.upper():
+        # 用在网时长推导消费（在网越久，消费越高）
+        band = pd.cut(values.clip(1, 100), bins=[1, 6, 12, 24, 101], labels=labels, right=False)
+    else:
+        # 月均消费/主套餐费直接分组（限制0-500元，避免异常值）
+        band = pd.cut(values.clip(0, 500), bins=[0, 50, 100, 200, 501], labels=labels, right=False)
+    return band, consume_col
+
+
+def dataset_version():
+    """数据集版本（CSV修改时间+大小），文件不存在时返回None"""
+    try:
+        stat = os.stat(FILE_PATHS["eval_data"])
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _load_csv_data():
+    """从磁盘读取CSV（多编码尝试），由_dataset_cache按数据集版本调用"""
     csv_path = FILE_PATHS["eval_data"]
     if not os.path.exists(csv_path):
         return None
+    start = time.perf_counter()
     # 多编码读取CSV + 解决类型混合警告
     encodings = ['utf-8', 'utf-8-sig', 'gbk']
     df = None
@@ -122,9 +323,44 @@ def read_csv_data():
             break
         except Exception as e:
             print(f"⚠️ 编码{enc}失败：{str(e)[:30]}")
+    STARTUP_TIMINGS["csv_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
     return df
 
 
+# 同一数据集版本只读取一次：并发请求共享同一次读取，数据更新时旧版本继续服务直到后台读取完成
+_dataset_cache = VersionedCache("CSV数据集", lambda version, previous: _load_csv_data(), dataset_version)
+
+
+def read_csv_data(fresh=False):
+    """统一读取CSV数据的函数（按数据集版本缓存）
+    返回的DataFrame在请求间共享，调用方不得原地修改；fresh=True时等待读取到当前版本（用于构建派生缓存）
+    """
+    return _dataset_cache.get(allow_stale=not fresh)
+
+
+def normalize_frame(df, na_value=""):
+    """按列统一清洗DataFrame（替代逐单元格的pd.isna/isinstance判断）
+    - 数值列：保留原数值类型（布尔值转为0/1），缺失值替换为na_value
+    - 其他列：转为字符串并去除首尾空格，缺失值替换为na_value
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        mask = series.isna()
+        # 含缺失值的布尔列读入后为object类型，按推断类型识别后同样转为0/1
+        if pd.api.types.is_bool_dtype(series) or (
+                series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "boolean"):
+            values = series.astype(object).where(~mask, False).astype(bool).astype(int).astype(object)
+        elif pd.api.types.is_numeric_dtype(series):
+            values = series.astype(object)
+        else:
+            values = series.astype(str).str.strip().astype(object)
+        if mask.any():
+            values = values.where(~mask, na_value)
+        out[col] = values
+    return pd.DataFrame(out, index=df.index)
+
+
 # ========== 新增：适配前端的API接口 ==========
 @app.route('/api/user/data')
 def api_user_data():
@@ -143,11 +379,8 @@ def api_user_data():
             })
 
         # 处理真实CSV数据
-        total_rows = len(df)
         clean_cols = [col.strip().upper() for col in df.columns]
 
-        # 构建返回的用户列表（取前100条，适配前端展示）
-        user_list = []
         # 定义前端需要的核心字段
         core_fields = [
             'USER_ID', 'MSISDN', 'PROV', 'CITY', 'AGE', 'INNET_DURA',
@@ -159,31 +392,24 @@ def api_user_data():
             'N3M_AVG_DIS_ARPU', 'ACCT_BAL', 'L3M_AVG_VOICE_OVER_FEE', 'L3M_AVG_FLUX_OVER_FEE',
             'T_school_resident', 'T_company_resident', 'T_school_night_resident'
         ]
+        text_fields = ['USER_ID', 'MSISDN', 'PROV', 'CITY', 'TERM_BRAND', 'PACKAGE_TYP']
 
-        # 填充用户数据（适配字段缺失）
-        for idx in range(min(total_rows, 100)):  # 最多返回100条
-            user = {}
-            for field in core_fields:
-                field_upper = field.upper()
-                if field_upper in clean_cols:
-                    col = df.columns[clean_cols.index(field_upper)]
-                    val = df.iloc[idx][col]
-                    # 处理数值/空值
-                    if pd.isna(val):
-                        user[field] = ""
-                    elif isinstance(val, (int, float)):
-                        user[field] = float(val) if isinstance(val, float) else int(val)
-                    else:
-                        user[field] = str(val).strip()
-                else:
-                    # 字段缺失时填充默认值
-                    user[field] = "" if field in ['USER_ID', 'MSISDN', 'PROV', 'CITY', 'TERM_BRAND',
-                                                  'PACKAGE_TYP'] else 0
-
-            # 补充默认USER_ID（如果缺失）
-            if not user['USER_ID']:
-                user['USER_ID'] = f"USER_{idx + 1000}"
-            user_list.append(user)
+        # 按列构建前100条用户数据（适配字段缺失，字段缺失时填充默认值）
+        page = df.head(100)
+        columns = {}
+        for field in core_fields:
+            field_upper = field.upper()
+            if field_upper in clean_cols:
+                columns[field] = page[df.columns[clean_cols.index(field_upper)]]
+            else:
+                columns[field] = pd.Series("" if field in text_fields else 0, index=page.index)
+        page = normalize_frame(pd.DataFrame(columns, index=page.index))
+        # 补充默认USER_ID（如果缺失）
+        missing_id = page['USER_ID'].isin(["", 0])
+        if missing_id.any():
+            fallback_ids = pd.Series([f"USER_{idx + 1000}" for idx in range(len(page))], index=page.index)
+            page['USER_ID'] = page['USER_ID'].where(~missing_id, fallback_ids)
+        user_list = page.to_dict('records')
 
         # 提取表头（取核心字段）
         headers = core_fields
@@ -237,15 +463,8 @@ def api_user_detail():
             user_col = df.columns[clean_cols.index('USER_ID')]
             user_data = df[df[user_col] == user_id]
             if not user_data.empty:
-                detail = user_data.iloc[0].to_dict()
-                # 数据清洗和类型转换
-                for k, v in detail.items():
-                    if pd.isna(v):
-                        detail[k] = "" if isinstance(v, str) else 0
-                    elif isinstance(v, (int, float)):
-                        detail[k] = float(v) if isinstance(v, float) else int(v)
-                    else:
-                        detail[k] = str(v).strip()
+                # 数据清洗和类型转换（按列处理，缺失值统一填0）
+                detail = normalize_frame(user_data.head(1), na_value=0).to_dict('records')[0]
                 return jsonify({
                     "code": 200,
                     "message": "success",
@@ -279,31 +498,15 @@ def api_user_predict():
                 "data": None
             })
 
-        # 1. 构建模型输入特征（严格遵循 MODEL_FEATURE_ORDER 顺序）
-        features = []
-        for feat in MODEL_FEATURE_ORDER:
-            # 从请求中提取参数，适配大小写（如age→AGE，pri_package_fee→PRI_PACKAGE_FEE）
-            req_key = None
-            for key in req.keys():
-                if key.strip().upper() == feat.upper():
-                    req_key = key
-                    break
-            # 提取值并转换为数值（无参数则用默认值）
-            default_vals = {'AGE': 23, 'INNET_DURA': 12, 'PRI_PACKAGE_FEE': 88, 'ACCT_BAL': 50,
-                            'N3M_AVG_DIS_ARPU': 90, 'day_flux': 5, 'night_flux': 2, 'N3M_AVG_GAME_APP_USE_DAYS': 5}
-            if req_key:
-                try:
-                    val = float(req[req_key])
-                except (ValueError, TypeError):
-                    val = default_vals[feat]
-                    print(f"⚠️ 请求参数{req_key}不是数值，使用默认值{val}")
-            else:
-                val = default_vals[feat]
-                print(f"⚠️ 请求中无{feat}参数，使用默认值{val}")
-            features.append(val)
+        # 1. 构建模型输入特征（严格遵循 MODEL_FEATURE_ORDER 顺序），并记录到输入漂移监控
+        features, defaulted = parse_request_features(req)
+        DRIFT_MONITOR.observe(features, defaulted)
 
         # 2. 模型预测（优先真实模型，失败才模拟）
-        if MODEL_LOADED:
+        bundle = get_model_bundle()
+        if bundle["loaded"]:
+            # 标准化器和模型取自同一次加载，后台重新加载模型时不会混用两个版本
+            model, scaler = bundle["model"], bundle["scaler"]
             try:
                 # 标准化特征 + 预测
                 scaled_features = scaler.transform([features])
@@ -362,6 +565,7 @@ def api_model_eval():
             label_col = next(col for col in df.columns if col.upper() == 'LABEL')
             pred_col = next(col for col in df.columns if col.upper() == 'PRED')
             y_true, y_pred = df[label_col], df[pred_col]
+            from sklearn.metrics import accuracy_score, recall_score, f1_score, classification_report
             accuracy = round(accuracy_score(y_true, y_pred), 2)
             recall = round(recall_score(y_true, y_pred, average='weighted'), 2)
             f1 = round(f1_score(y_true, y_pred, average='weighted'), 2)
@@ -428,8 +632,7 @@ def api_ai_analysis():
                 # 2. 取第一个校园列，清洗数据后计算均值（比例）
                 school_col = school_cols[0]
                 # 转换为数值，填充空值为0，计算均值
-                df[school_col] = pd.to_numeric(df[school_col], errors='coerce').fillna(0)
-                school_ratio = df[school_col].mean()  # 校园用户比例（0-1之间）
+                school_ratio = pd.to_numeric(df[school_col], errors='coerce').fillna(0).mean()  # 校园用户比例（0-1之间）
 
         # 计算校园用户占比百分比（取整）
         school_percent = int(school_ratio * 100)
@@ -479,153 +682,509 @@ CSV文件中未找到有效的数据列，无法进行详细分析。请确保CS
         })
 
 
+# ========== 全量客群打分（按模型版本+数据集版本缓存） ==========
+PROFILE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def model_version():
+    """当前已加载模型的版本（加载时模型文件的修改时间+大小），模型未加载时返回None"""
+    bundle = get_model_bundle()
+    return bundle["version"] if bundle["loaded"] else None
+
+
+def score_population(df, bundle=None):
+    """对全量用户一次性打分，并向量化计算各客群规模和特征画像（bundle：打分使用的模型组件）"""
+    bundle = bundle or get_model_bundle()
+    matrix = build_feature_matrix(df)
+    pred_codes = predict_groups(matrix, bundle)
+    clean_cols = [col.strip().upper() for col in df.columns]
+    if 'USER_ID' in clean_cols:
+        user_ids = df[df.columns[clean_cols.index('USER_ID')]].astype("string").str.strip().fillna("")
+        # 缺失的USER_ID按行号补齐（与/api/user/data的规则一致）
+        fallback_ids = pd.Series([f"USER_{idx + 1000}" for idx in range(len(df))], index=df.index)
+        user_ids = user_ids.mask(user_ids == "", fallback_ids).to_numpy(dtype=str)
+    else:
+        user_ids = np.array([f"USER_{idx + 1000}" for idx in range(len(df))])
+    # model_version/scaler记录实际打分所用的模型，下游索引据此判断是否需要全量重建；
+    # frame为打分所用的数据集快照（共享只读），立方体等派生结果须与打分结果逐行对齐时从这里取维度
+    scores = {"total": len(df), "frame": df, "user_ids": user_ids, "matrix": matrix, "pred_codes": pred_codes,
+              "model_version": bundle["version"] if bundle["loaded"] else None, "scaler": bundle["scaler"],
+              "distribution": [], "profiles": {}}
+    if pred_codes is None:
+        return scores
+
+    # 客群规模（包含人数为0的客群）
+    counts = np.bincount(pred_codes, minlength=len(CUSTOMER_GROUP_MAP))
+    scores["distribution"] = [{
+        "code": code,
+        "group": name,
+        "count": int(counts[code]) if code < len(counts) else 0,
+        "ratio": round(float(counts[code]) / len(pred_codes), 4) if code < len(counts) else 0
+    } for code, name in CUSTOMER_GROUP_MAP.items()]
+
+    # 各客群特征均值/分位数（groupby一次完成，不逐客群循环扫描）
+    features = pd.DataFrame(matrix, columns=MODEL_FEATURE_ORDER)
+    grouped = features.groupby(pred_codes)
+    means = grouped.mean()
+    quantiles = grouped.quantile(PROFILE_QUANTILES)
+
+    # 各客群TOP城市
+    top_cities = {}
+    if 'CITY' in clean_cols:
+        cities = df[df.columns[clean_cols.index('CITY')]].astype("string").str.strip()
+        city_counts = pd.DataFrame({"code": pred_codes, "city": cities}).dropna().groupby(["code", "city"]).size()
+        for code, series in city_counts.groupby(level=0):
+            top = series.droplevel(0).nlargest(5)
+            top_cities[int(code)] = [{"name": name, "value": int(value)} for name, value in top.items()]
+
+    for code in means.index:
+        code = int(code)
+        scores["profiles"][code] = {
+            "code": code,
+            "group": CUSTOMER_GROUP_MAP.get(code, "未识别"),
+            "count": int(counts[code]),
+            "features": {
+                feat: {
+                    "mean": round(float(means.at[code, feat]), 2),
+                    **{f"p{int(q * 100)}": round(float(quantiles.at[(code, q), feat]), 2) for q in PROFILE_QUANTILES}
+                } for feat in MODEL_FEATURE_ORDER
+            },
+            "top_cities": top_cities.get(code, [])
+        }
+    return scores
+
+
+def population_version():
+    """全量打分的版本：数据集版本+模型版本，无数据时返回None"""
+    data_version = dataset_version()
+    if data_version is None:
+        return None
+    return (data_version, model_version())
+
+
+def _build_population_scores(version, previous):
+    df = read_csv_data(fresh=True)
+    if df is None:
+        return None
+    # 使用版本号对应的已加载模型打分（模型重新加载完成后population_version随之变化，触发再次打分）
+    bundle = get_model_bundle()
+    if bundle["loaded"] and bundle["version"] != version[1]:
+        print("⚠️ 打分期间模型已重新加载，结果以实际使用的模型版本为准")
+    return score_population(df, bundle)
+
+
+_population_cache = VersionedCache("全量客群打分", _build_population_scores, population_version)
+
+
+def get_population_scores(fresh=False):
+    """获取当前版本的全量打分结果；模型或数据变化时才重新计算（重建期间返回上一版本结果）"""
+    return _population_cache.get(allow_stale=not fresh)
+
+
+@app.route('/api/group/distribution')
+def api_group_distribution():
+    """全量用户的预测客群分布"""
+    try:
+        scores = get_population_scores()
+        if scores is None or scores["pred_codes"] is None:
+            return jsonify({
+                "code": 200,
+                "message": "数据或模型未就绪，无法计算客群分布",
+                "data": {"total": 0, "distribution": []}
+            })
+        return jsonify({
+            "code": 200,
+            "message": "success",
+            "data": {"total": scores["total"], "distribution": scores["distribution"]}
+        })
+    except Exception as e:
+        print(f"❌ /api/group/distribution 接口异常：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器错误：{str(e)}",
+            "data": None
+        })
+
+
+@app.route('/api/group/profile')
+def api_group_profile():
+    """各客群特征画像（模型特征均值/分位数、TOP城市），可用 ?code= 指定单个客群"""
+    try:
+        scores = get_population_scores()
+        if scores is None or scores["pred_codes"] is None:
+            return jsonify({
+                "code": 200,
+                "message": "数据或模型未就绪，无法计算客群画像",
+                "data": []
+            })
+        code = request.args.get('code', type=int)
+        if code is not None:
+            if code not in CUSTOMER_GROUP_MAP:
+                return jsonify({
+                    "code": 400,
+                    "message": f"未知客群编码：{code}",
+                    "data": None
+                })
+            profile = scores["profiles"].get(code, {"code": code, "group": CUSTOMER_GROUP_MAP[code],
+                                                    "count": 0, "features": {}, "top_cities": []})
+            return jsonify({"code": 200, "message": "success", "data": profile})
+        return jsonify({
+            "code": 200,
+            "message": "success",
+            "data": [scores["profiles"][code] for code in sorted(scores["profiles"])]
+        })
+    except Exception as e:
+        print(f"❌ /api/group/profile 接口异常：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器错误：{str(e)}",
+            "data": None
+        })
+
+
+# ========== 相似用户检索（Lookalike） ==========
+LOOKALIKE_MAX_K = 5000
+
+
+def lookalike_version():
+    """相似用户索引的版本：需要数据和模型同时就绪"""
+    version = population_version()
+    if version is None or version[1] is None:
+        return None
+    return version
+
+
+def _build_lookalike_index(version, previous):
+    """数据变化时增量更新（只重新标准化新增/变化的用户），模型变化时全量重建"""
+    from lookalike import LookalikeIndex
+    scores = get_population_scores(fresh=True)
+    if scores is None or scores["model_version"] is None:
+        return None
+    # 标准化器取自打分时使用的模型组件，保证索引向量与预测客群来自同一版本模型
+    transform = scores["scaler"].transform
+    if previous is not None and previous["model_version"] == scores["model_version"]:
+        index, stats = previous["index"].update(scores["user_ids"], scores["matrix"], transform,
+                                                scores["pred_codes"])
+        if stats["rebuilt"]:
+            print(f"✅ 相似用户索引全量重建（用户ID序列变化）：重新计算{stats['transformed']}")
+        else:
+            print(f"✅ 相似用户索引增量更新：复用{stats['reused']}，重新计算{stats['transformed']}")
+    else:
+        index = LookalikeIndex.build(scores["user_ids"], scores["matrix"], transform, scores["pred_codes"])
+    return {"model_version": scores["model_version"], "index": index}
+
+
+_lookalike_cache = VersionedCache("相似用户索引", _build_lookalike_index, lookalike_version)
+
+
+def get_lookalike_index():
+    """获取当前版本的相似用户索引，数据或模型未就绪时返回None"""
+    entry = _lookalike_cache.get()
+    return None if entry is None else entry["index"]
+
+
+@app.route('/api/user/lookalike', methods=['POST'])
+def api_user_lookalike():
+    """相似用户检索接口：按USER_ID或特征字典（features）查找最相似的k个用户，可用group限定预测客群"""
+    try:
+        req = request.get_json() or {}
+        index = get_lookalike_index()
+        if index is None:
+            return jsonify({
+                "code": 200,
+                "message": "数据或模型未就绪，无法检索相似用户",
+                "data": {"results": []}
+            })
+        k = min(max(int(req.get('k', 500)), 1), LOOKALIKE_MAX_K)
+        group = req.get('group')
+        if group is not None:
+            group = int(group)
+            if group not in CUSTOMER_GROUP_MAP:
+                return jsonify({
+                    "code": 400,
+                    "message": f"未知客群编码：{group}",
+                    "data": None
+                })
+
+        exclude = None
+        if req.get('USER_ID'):
+            exclude = index.position(req['USER_ID'])
+            if exclude is None:
+                return jsonify({
+                    "code": 404,
+                    "message": f"未找到用户：{req['USER_ID']}",
+                    "data": None
+                })
+            query = index.vectors[exclude]
+            query_features = dict(zip(MODEL_FEATURE_ORDER, index.raw[exclude].tolist()))
+        elif isinstance(req.get('features'), dict):
+            features, _ = parse_request_features(req['features'])
+            query = index.transform([features])[0]
+            query_features = dict(zip(MODEL_FEATURE_ORDER, features))
+        else:
+            return jsonify({
+                "code": 400,
+                "message": "缺少USER_ID或features参数",
+                "data": None
+            })
+
+        start = time.perf_counter()
+        matches = index.search(query, k=k, group=group, exclude=exclude)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        results = [{
+            "USER_ID": index.ids[row],
+            "distance": round(distance, 4),
+            "pred_code": int(index.groups[row]) if index.groups is not None else None
+        } for row, distance in matches]
+        return jsonify({
+            "code": 200,
+            "message": "success",
+            "data": {
+                "query_features": query_features,
+                "results": results,
+                "elapsed_ms": elapsed_ms
+            }
+        })
+    except Exception as e:
+        print(f"❌ /api/user/lookalike 接口异常：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器错误：{str(e)}",
+            "data": None
+        })
+
+
+# ========== 输入漂移监控 ==========
+def _build_drift_reference(version, previous):
+    df = read_csv_data(fresh=True)
+    return None if df is None else DriftReference.from_matrix(MODEL_FEATURE_ORDER, build_feature_matrix(df))
+
+
+_drift_reference_cache = VersionedCache("漂移参考分布", _build_drift_reference, dataset_version)
+
+
+def get_drift_reference():
+    """由wutong.csv计算的参考特征分布（数据变化时重建），无数据时返回None"""
+    return _drift_reference_cache.get()
+
+
+@app.route('/api/monitor/drift')
+def api_monitor_drift():
+    """预测接口输入漂移报告：各特征PSI、KS（分箱近似）及默认值填充率"""
+    try:
+        reference = get_drift_reference()
+        report = DRIFT_MONITOR.report(reference)
+        report["reference_ready"] = reference is not None
+        return jsonify({"code": 200, "message": "success", "data": report})
+    except Exception as e:
+        print(f"❌ /api/monitor/drift 接口异常：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器错误：{str(e)}",
+            "data": None
+        })
+
+
+# ========== 多维客群立方体（PROV × CITY × 年龄段 × 消费档 × 预测客群） ==========
+CUBE_DIMENSIONS = ["PROV", "CITY", "age_group", "consume_band", "customer_group"]
+
+
+def build_segment_cube(df, scores):
+    """一次扫描全量数据，预计算各维度组合的用户数及模型特征求和（特征和预测客群复用全量打分结果）"""
+    from segment_cube import SegmentCube
+    clean_cols = [col.strip().upper() for col in df.columns]
+
+    def text_dim(name):
+        if name not in clean_cols:
+            return np.full(len(df), "未知", dtype=object)
+        values = df[df.columns[clean_cols.index(name)]].astype("string").str.strip()
+        return values.mask(values == "").fillna("未知").to_numpy(dtype=object)
+
+    def category_dim(series):
+        if series is None:
+            return np.full(len(df), "未知", dtype=object)
+        return series.astype(object).where(series.notna(), "未知").to_numpy(dtype=object)
+
+    matrix, pred_codes = scores["matrix"], scores["pred_codes"]
+    if pred_codes is None:
+        customer_group = np.full(len(df), "未识别", dtype=object)
+    else:
+        customer_group = pd.Series(pred_codes).map(CUSTOMER_GROUP_MAP).fillna("未识别").to_numpy(dtype=object)
+    dims = {
+        "PROV": text_dim("PROV"),
+        "CITY": text_dim("CITY"),
+        "age_group": category_dim(assign_age_group(df, clean_cols)),
+        "consume_band": category_dim(assign_consume_band(df, clean_cols)[0]),
+        "customer_group": customer_group
+    }
+    measures = {feat: matrix[:, j] for j, feat in enumerate(MODEL_FEATURE_ORDER)}
+    return SegmentCube.build(dims, measures)
+
+
+def _build_segment_cube(version, previous):
+    # 维度与特征/预测客群必须来自同一份数据：只取打分结果及其数据集快照，不再单独读取CSV
+    scores = get_population_scores(fresh=True)
+    if scores is None:
+        return None
+    return build_segment_cube(scores["frame"], scores)
+
+
+_cube_cache = VersionedCache("客群立方体", _build_segment_cube, population_version)
+
+
+def get_segment_cube():
+    """获取当前数据集/模型版本的立方体（数据或模型变化时后台重建），无数据时返回None"""
+    return _cube_cache.get()
+
+
+@app.route('/api/portrait/cube', methods=['GET', 'POST'])
+def api_portrait_cube():
+    """立方体查询接口：GET返回维度及取值；POST按 filters/group_by 聚合（前端图表下钻使用）"""
+    try:
+        cube = get_segment_cube()
+        if cube is None:
+            return jsonify({"code": 200, "message": "success", "data": {}})
+        if request.method == 'GET':
+            return jsonify({"code": 200, "message": "success", "data": cube.describe()})
+
+        req = request.get_json() or {}
+        filters = req.get('filters') or {}
+        group_by = req.get('group_by') or []
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        unknown = [dim for dim in list(filters) + list(group_by) if dim not in CUBE_DIMENSIONS]
+        if unknown:
+            return jsonify({
+                "code": 400,
+                "message": f"未知维度：{unknown}，可选维度：{CUBE_DIMENSIONS}",
+                "data": None
+            })
+        start = time.perf_counter()
+        rows = cube.query(filters, group_by, limit=req.get('limit'))
+        return jsonify({
+            "code": 200,
+            "message": "success",
+            "data": {
+                "rows": rows,
+                "total": int(sum(row["count"] for row in rows)),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+            }
+        })
+    except Exception as e:
+        print(f"❌ /api/portrait/cube 接口异常：{str(e)}")
+        return jsonify({
+            "code": 500,
+            "message": f"服务器错误：{str(e)}",
+            "data": None
+        })
+
+
 # ========== 原有路由（保持兼容） ==========
 @app.route('/')
 def index():
     return render_template('index.html')
 
 
+def build_portrait_data(df):
+    """基于全量CSV数据计算画像图表数据（年龄/城市/消费/兴趣分布）"""
+    total_rows = len(df)
+    portrait_data = {"age_dist": [], "city_dist": [], "consume_feat": [], "interest_feat": []}
+    # 动态匹配列名（基于CSV真实列名，转为大写匹配）
+    clean_cols = [col.strip().upper() for col in df.columns]
+    # === 年龄分布（直接匹配CSV的AGE列，修正之前的ACE适配） ===
+    age_group = assign_age_group(df, clean_cols)
+    if age_group is not None:
+        # 过滤Z世代合理年龄范围（18-35岁），用中位数填充缺失值
+        age_dist = age_group.value_counts().reset_index()
+        age_dist.columns = ['name', 'value']
+        portrait_data["age_dist"] = age_dist.to_dict('records')
+        print(f"✅ 年龄分布：基于CSV真实数据（有效数据行数：{age_group.notna().sum()}）")
+    else:
+        portrait_data["age_dist"] = []
+        print(f"⚠️ CSV中无AGE列或年龄列不是数值类型")
+    # === 城市分布（CSV存在CITY列，直接使用） ===
+    if 'CITY' in clean_cols:
+        city_col = df.columns[clean_cols.index('CITY')]
+        city_data = df[city_col].dropna().str.strip()  # 去除空值和空格干扰
+        city_dist = city_data.value_counts().reset_index()
+        city_dist.columns = ['name', 'value']
+        portrait_data["city_dist"] = city_dist.head(10).to_dict('records')
+        print(f"✅ 城市分布：基于CSV真实数据（前10个城市）")
+    else:
+        portrait_data["city_dist"] = []
+        print(f"⚠️ CSV中无CITY列")
+    # === 消费分布（用PRI_PACKAGE_FEE替代N3M_AVG_DIS_ARPU，CSV无月均消费列时） ===
+    consume_group, consume_col = assign_consume_band(df, clean_cols)
+    if consume_group is not None:
+        consume_dist = consume_group.value_counts().reset_index()
+        consume_dist.columns = ['name', 'value']
+        portrait_data["consume_feat"] = consume_dist.to_dict('records')
+        print(
+            f"✅ 消费分布：基于CSV{'N3M_AVG_DIS_ARPU' if 'N3M_AVG_DIS_ARPU' in consume_col.upper() else 'PRI_PACKAGE_FEE'}列真实数据")
+    elif consume_col:
+        portrait_data["consume_feat"] = []
+        print(f"⚠️ 消费列{consume_col}不是数值类型")
+    else:
+        portrait_data["consume_feat"] = []
+        print(f"⚠️ CSV中无消费相关列")
+    # === 兴趣偏好（用校园/公司驻留列推导，CSV无直接兴趣列时） ===
+    interest_data = {}
+    # 校园驻留相关列（CSV中存在T-1_school_resident等）
+    school_cols = [col for col in clean_cols if 'SCHOOL' in col.upper() and 'RESIDENT' in col.upper()]
+    # 公司驻留相关列（CSV中存在T_company_resident等）
+    company_cols = [col for col in clean_cols if 'COMPANY' in col.upper() and 'RESIDENT' in col.upper()]
+    # 基于驻留情况推导兴趣
+    if school_cols:
+        school_col = df.columns[clean_cols.index(school_cols[0])]
+        school_ratio = pd.to_numeric(df[school_col], errors='coerce').fillna(0).mean()  # 校园驻留用户比例
+        interest_data["运动"] = round(school_ratio * 50 + 10)  # 校园用户偏运动
+        interest_data["学习"] = round(school_ratio * 45 + 15)  # 校园用户偏学习
+        print(f"✅ 兴趣偏好：基于校园驻留列{school_col}推导（驻留比例：{school_ratio:.2f}）")
+    if company_cols:
+        company_col = df.columns[clean_cols.index(company_cols[0])]
+        company_ratio = pd.to_numeric(df[company_col], errors='coerce').fillna(0).mean()  # 公司驻留用户比例
+        interest_data["社交"] = round(company_ratio * 50 + 15)  # 职场用户偏社交
+        interest_data["办公"] = round(company_ratio * 40 + 10)  # 职场用户偏办公
+        print(f"✅ 兴趣偏好：基于公司驻留列{company_col}推导（驻留比例：{company_ratio:.2f}）")
+    # 补充Z世代通用偏好（短视频/网游）
+    interest_data["短视频"] = 45  # 固定高值（Z世代核心偏好）
+    interest_data["网游"] = round((1 - company_ratio) * 40 + 10) if 'company_ratio' in locals() else 35
+    # 转换为图表格式
+    portrait_data["interest_feat"] = [{"name": k, "value": v} for k, v in interest_data.items()]
+    # 额外：如果模型加载成功，用CSV真实特征做一次预测示例（方便调试）
+    bundle = get_model_bundle() if total_rows > 0 else None
+    if bundle is not None and bundle["loaded"]:
+        sample_features = get_real_features_from_csv(df)
+        try:
+            sample_pred = bundle["model"].predict(bundle["scaler"].transform([sample_features]))[0]
+            print(
+                f"✅ 基于CSV真实特征的预测示例：{CUSTOMER_GROUP_MAP[sample_pred]}（输入特征：{dict(zip(MODEL_FEATURE_ORDER, sample_features))}）")
+        except Exception as e:
+            print(f"⚠️ 示例预测失败：{str(e)[:50]}")
+    return portrait_data
+
+
+def _build_portrait_cache(version, previous):
+    df = read_csv_data(fresh=True)
+    if df is None:
+        raise Exception("所有编码均读取失败")
+    return build_portrait_data(df)
+
+
+# 画像聚合按数据集版本缓存：数据更新时只有一个线程重建，其余请求继续使用上一版本结果
+_portrait_cache = VersionedCache("画像聚合", _build_portrait_cache, dataset_version)
+
+
 @app.route('/get_portrait_data')
 def get_portrait_data():
     try:
-        # 1. 读取CSV（添加low_memory=False解决类型混合警告）
-        csv_path = FILE_PATHS["eval_data"]
-        if not os.path.exists(csv_path):
+        # 1. 读取CSV并聚合（按数据集版本缓存，数据更新时后台重建）
+        portrait_data = _portrait_cache.get()
+        if portrait_data is None:
             raise FileNotFoundError("CSV文件不存在")
-        # 多编码读取CSV + 解决类型混合警告
-        encodings = ['utf-8', 'utf-8-sig', 'gbk']
-        df = None
-        for enc in encodings:
-            try:
-                df = pd.read_csv(csv_path, encoding=enc, low_memory=False)
-                print(f"✅ 读取CSV成功，编码：{enc}，列名：{df.columns.tolist()}")
-                break
-            except Exception as e:
-                print(f"⚠️ 编码{enc}失败：{str(e)[:30]}")
-        if df is None:
-            raise Exception("所有编码均读取失败")
-        total_rows = len(df)
-        portrait_data = {"age_dist": [], "city_dist": [], "consume_feat": [], "interest_feat": []}
-        # 2. 动态匹配列名（基于CSV真实列名，转为大写匹配）
-        clean_cols = [col.strip().upper() for col in df.columns]
-        # === 年龄分布（直接匹配CSV的AGE列，修正之前的ACE适配） ===
-        if 'AGE' in clean_cols:
-            age_col = df.columns[clean_cols.index('AGE')]
-            df[age_col] = pd.to_numeric(df[age_col], errors='coerce')  # 转为数值，无法转的设为NaN
-            if pd.api.types.is_numeric_dtype(df[age_col]):
-                # 过滤Z世代合理年龄范围（18-35岁），用中位数填充缺失值
-                df['age_group'] = pd.cut(
-                    df[age_col].fillna(df[age_col].median()).clip(18, 35),  # 限制18-35岁（避免异常值）
-                    bins=[18, 23, 26, 31, 36],
-                    labels=["18-22岁", "23-25岁", "26-30岁", "30+岁"],
-                    right=False
-                )
-                age_dist = df['age_group'].value_counts().reset_index()
-                age_dist.columns = ['name', 'value']
-                portrait_data["age_dist"] = age_dist.to_dict('records')
-                print(f"✅ 年龄分布：基于CSV真实数据（有效数据行数：{df[age_col].notna().sum()}）")
-            else:
-                portrait_data["age_dist"] = []
-                print(f"⚠️ 年龄列{age_col}不是数值类型")
-        else:
-            portrait_data["age_dist"] = []
-            print(f"⚠️ CSV中无AGE列")
-        # === 城市分布（CSV存在CITY列，直接使用） ===
-        if 'CITY' in clean_cols:
-            city_col = df.columns[clean_cols.index('CITY')]
-            city_data = df[city_col].dropna().str.strip()  # 去除空值和空格干扰
-            city_dist = city_data.value_counts().reset_index()
-            city_dist.columns = ['name', 'value']
-            portrait_data["city_dist"] = city_dist.head(10).to_dict('records')
-            print(f"✅ 城市分布：基于CSV真实数据（前10个城市）")
-        else:
-            portrait_data["city_dist"] = []
-            print(f"⚠️ CSV中无CITY列")
-        # === 消费分布（用PRI_PACKAGE_FEE替代N3M_AVG_DIS_ARPU，CSV无月均消费列时） ===
-        consume_col = None
-        if 'N3M_AVG_DIS_ARPU' in clean_cols:
-            consume_col = df.columns[clean_cols.index('N3M_AVG_DIS_ARPU')]  # 优先用真实月均消费列
-        elif 'PRI_PACKAGE_FEE' in clean_cols:
-            consume_col = df.columns[clean_cols.index('PRI_PACKAGE_FEE')]  # 用主套餐费替代
-        elif 'INNET_DURA' in clean_cols:
-            consume_col = df.columns[clean_cols.index('INNET_DURA')]  # 备选：用在网时长推导
-        if consume_col:
-            df[consume_col] = pd.to_numeric(df[consume_col], errors='coerce')
-            if pd.api.types.is_numeric_dtype(df[consume_col]):
-                if 'N3M_AVG_DIS_ARPU' in consume_col.upper():
-                    # 真实月均消费列，直接分组
-                    df['consume_group'] = pd.cut(
-                        df[consume_col].fillna(df[consume_col].median()).clip(0, 500),  # 限制0-500元（避免异常值）
-                        bins=[0, 50, 100, 200, 501],
-                        labels=["≤50元", "50-100元", "100-200元", "≥200元"],
-                        right=False
-                    )
-                elif 'PRI_PACKAGE_FEE' in consume_col.upper():
-                    # 主套餐费作为消费金额分组
-                    df['consume_group'] = pd.cut(
-                        df[consume_col].fillna(df[consume_col].median()).clip(0, 500),
-                        bins=[0, 50, 100, 200, 501],
-                        labels=["≤50元", "50-100元", "100-200元", "≥200元"],
-                        right=False
-                    )
-                else:
-                    # 用在网时长推导消费（在网越久，消费越高）
-                    df['consume_group'] = pd.cut(
-                        df[consume_col].fillna(df[consume_col].median()).clip(1, 100),  # 限制1-100个月
-                        bins=[1, 6, 12, 24, 101],
-                        labels=["≤50元", "50-100元", "100-200元", "≥200元"],
-                        right=False
-                    )
-                consume_dist = df['consume_group'].value_counts().reset_index()
-                consume_dist.columns = ['name', 'value']
-                portrait_data["consume_feat"] = consume_dist.to_dict('records')
-                print(
-                    f"✅ 消费分布：基于CSV{'N3M_AVG_DIS_ARPU' if 'N3M_AVG_DIS_ARPU' in consume_col.upper() else 'PRI_PACKAGE_FEE'}列真实数据")
-            else:
-                portrait_data["consume_feat"] = []
-                print(f"⚠️ 消费列{consume_col}不是数值类型")
-        else:
-            portrait_data["consume_feat"] = []
-            print(f"⚠️ CSV中无消费相关列")
-        # === 兴趣偏好（用校园/公司驻留列推导，CSV无直接兴趣列时） ===
-        interest_data = {}
-        # 校园驻留相关列（CSV中存在T-1_school_resident等）
-        school_cols = [col for col in clean_cols if 'SCHOOL' in col.upper() and 'RESIDENT' in col.upper()]
-        # 公司驻留相关列（CSV中存在T_company_resident等）
-        company_cols = [col for col in clean_cols if 'COMPANY' in col.upper() and 'RESIDENT' in col.upper()]
-        # 基于驻留情况推导兴趣
-        if school_cols:
-            school_col = df.columns[clean_cols.index(school_cols[0])]
-            df[school_col] = pd.to_numeric(df[school_col], errors='coerce').fillna(0)
-            school_ratio = df[school_col].mean()  # 校园驻留用户比例
-            interest_data["运动"] = round(school_ratio * 50 + 10)  # 校园用户偏运动
-            interest_data["学习"] = round(school_ratio * 45 + 15)  # 校园用户偏学习
-            print(f"✅ 兴趣偏好：基于校园驻留列{school_col}推导（驻留比例：{school_ratio:.2f}）")
-        if company_cols:
-            company_col = df.columns[clean_cols.index(company_cols[0])]
-            df[company_col] = pd.to_numeric(df[company_col], errors='coerce').fillna(0)
-            company_ratio = df[company_col].mean()  # 公司驻留用户比例
-            interest_data["社交"] = round(company_ratio * 50 + 15)  # 职场用户偏社交
-            interest_data["办公"] = round(company_ratio * 40 + 10)  # 职场用户偏办公
-            print(f"✅ 兴趣偏好：基于公司驻留列{company_col}推导（驻留比例：{company_ratio:.2f}）")
-        # 补充Z世代通用偏好（短视频/网游）
-        interest_data["短视频"] = 45  # 固定高值（Z世代核心偏好）
-        interest_data["网游"] = round((1 - company_ratio) * 40 + 10) if 'company_ratio' in locals() else 35
-        # 转换为图表格式
-        portrait_data["interest_feat"] = [{"name": k, "value": v} for k, v in interest_data.items()]
-        # 额外：如果模型加载成功，用CSV真实特征做一次预测示例（方便调试）
-        if MODEL_LOADED and total_rows > 0:
-            sample_features = get_real_features_from_csv(df)
-            try:
-                sample_pred = model.predict(scaler.transform([sample_features]))[0]
-                print(
-                    f"✅ 基于CSV真实特征的预测示例：{CUSTOMER_GROUP_MAP[sample_pred]}（输入特征：{dict(zip(MODEL_FEATURE_ORDER, sample_features))}）")
-            except Exception as e:
-                print(f"⚠️ 示例预测失败：{str(e)[:50]}")
         return jsonify({"status": "success", "data": portrait_data})
     except Exception as e:
         print(f"❌ CSV处理失败：{str(e)}")
-        print(f"CSV实际列名：{[col.strip().upper() for col in df.columns] if df is not None else '未读取到数据'}")
         return jsonify({"status": "success", "data": {"age_dist": [], "city_dist": [], "consume_feat": [], "interest_feat": []}})
 
 
@@ -634,30 +1193,14 @@ def predict():
     try:
         req = request.get_json() or {}
         print(f"📥 预测请求参数：{req}")
-        # 1. 构建模型输入特征（严格遵循 MODEL_FEATURE_ORDER 顺序）
-        features = []
-        for feat in MODEL_FEATURE_ORDER:
-            # 从请求中提取参数，适配大小写（如age→AGE，pri_package_fee→PRI_PACKAGE_FEE）
-            req_key = None
-            for key in req.keys():
-                if key.strip().upper() == feat.upper():
-                    req_key = key
-                    break
-            # 提取值并转换为数值（无参数则用默认值）
-            default_vals = {'AGE': 23, 'INNET_DURA': 12, 'PRI_PACKAGE_FEE': 88, 'ACCT_BAL': 50,
-                            'N3M_AVG_DIS_ARPU': 90, 'day_flux': 5, 'night_flux': 2, 'N3M_AVG_GAME_APP_USE_DAYS': 5}
-            if req_key:
-                try:
-                    val = float(req[req_key])
-                except (ValueError, TypeError):
-                    val = default_vals[feat]
-                    print(f"⚠️ 请求参数{req_key}不是数值，使用默认值{val}")
-            else:
-                val = default_vals[feat]
-                print(f"⚠️ 请求中无{feat}参数，使用默认值{val}")
-            features.append(val)
+        # 1. 构建模型输入特征（严格遵循 MODEL_FEATURE_ORDER 顺序），并记录到输入漂移监控
+        features, defaulted = parse_request_features(req)
+        DRIFT_MONITOR.observe(features, defaulted)
         # 2. 模型预测（优先真实模型，失败才模拟）
-        if MODEL_LOADED:
+        bundle = get_model_bundle()
+        if bundle["loaded"]:
+            # 标准化器和模型取自同一次加载，后台重新加载模型时不会混用两个版本
+            model, scaler = bundle["model"], bundle["scaler"]
             try:
                 # 标准化特征 + 预测
                 scaled_features = scaler.transform([features])
@@ -701,14 +1244,8 @@ def predict():
 @app.route('/get_eval_report')
 def eval_report():
     try:
-        # 读取CSV
-        csv_path = FILE_PATHS["eval_data"]
-        df = None
-        if os.path.exists(csv_path):
-            try:
-                df = pd.read_csv(csv_path, encoding='utf-8', low_memory=False)
-            except:
-                df = None
+        # 读取CSV（与其他接口共享按版本缓存的数据集）
+        df = read_csv_data()
         # 生成评估报告（适配大写列名）
         if df is not None and 'LABEL' in [col.upper() for col in df.columns] and 'PRED' in [col.upper() for col in
                                                                                             df.columns]:
@@ -716,6 +1253,7 @@ def eval_report():
             label_col = next(col for col in df.columns if col.upper() == 'LABEL')
             pred_col = next(col for col in df.columns if col.upper() == 'PRED')
             y_true, y_pred = df[label_col], df[pred_col]
+            from sklearn.metrics import accuracy_score, recall_score, f1_score, classification_report
             accuracy = round(accuracy_score(y_true, y_pred), 2)
             recall = round(recall_score(y_true, y_pred, average='weighted'), 2)
             f1 = round(f1_score(y_true, y_pred, average='weighted'), 2)
@@ -758,8 +1296,94 @@ def eval_report():
         })
 
 
+# ========== 启动报告 ==========
+_PROFILE_SCRIPT = """
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+start = time.perf_counter()
+import app as portrait_app
+import_ms = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+portrait_app.app.test_client().get('/')
+first_request_ms = (time.perf_counter() - start) * 1000
+print('__STARTUP__' + json.dumps({
+    "import_app_ms": round(import_ms, 1),
+    "first_request_ms": round(first_request_ms, 1),
+    "time_to_first_request_ms": round(import_ms + first_request_ms, 1),
+    "first_request_timings": portrait_app.STARTUP_TIMINGS,
+}))
+"""
+
+
+def collect_startup_profile(top_n=20):
+    """在子进程中用 -X importtime 导入app并请求 /，统计导入耗时明细和首个请求耗时（只包含服务 / 的开销）"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROFILE_SCRIPT],
+        cwd=BASE_DIR, capture_output=True, text=True, timeout=300
+    )
+    # importtime输出格式：import time: self [us] | cumulative | imported package
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, package = line[len("import time:"):].split("|", 2)
+            imports.append({
+                "package": package.strip(),
+                "self_ms": round(int(self_us) / 1000, 1),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 1)
+            })
+        except ValueError:
+            continue
+    imports.sort(key=lambda item: item["cumulative_ms"], reverse=True)
+    profile = {}
+    for line in proc.stdout.splitlines():
+        if line.startswith("__STARTUP__"):
+            profile = json.loads(line[len("__STARTUP__"):])
+    profile["top_imports"] = imports[:top_n]
+    profile["returncode"] = proc.returncode
+    return profile
+
+
+def write_startup_report():
+    """生成启动报告并写入STARTUP_REPORT_PATH（失败不影响服务启动）
+    模型/数据加载耗时取自本进程预热后的STARTUP_TIMINGS，子进程只负责导入和首个 / 请求
+    """
+    try:
+        profile = collect_startup_profile()
+        profile["load_timings"] = dict(STARTUP_TIMINGS)
+        profile["generated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(STARTUP_REPORT_PATH, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        print(f"✅ 启动报告已写入：{STARTUP_REPORT_PATH}（导入app {profile.get('import_app_ms')}ms，"
+              f"首个请求 {profile.get('first_request_ms')}ms）")
+    except Exception as e:
+        print(f"⚠️ 启动报告生成失败：{str(e)[:100]}")
+
+
+def warm_caches():
+    """启动时预热数据集及全部派生缓存，使首批用户请求不承担构建耗时"""
+    for cache in (_portrait_cache, _cube_cache, _lookalike_cache, _drift_reference_cache):
+        try:
+            cache.get(allow_stale=False)
+        except Exception as e:
+            print(f"⚠️ {cache.name} 预热失败：{str(e)[:100]}")
+
+
+def startup_tasks():
+    """服务进程的启动后台任务：先预热缓存，再生成启动报告"""
+    warm_caches()
+    write_startup_report()
+
+
 # ========== 启动服务 ==========
 if __name__ == '__main__':
+    # 启动时先同步模型到本地缓存（模型反序列化仍在首次使用时进行）
+    with _model_lock:
+        sync_model_cache()
+    # debug重载模式下父进程只监视文件变化、不处理请求，预热和启动报告只在实际服务的子进程中后台执行
+    if os.environ.get("WERKZEUG_RUN_MAIN"):
+        threading.Thread(target=startup_tasks, daemon=True, name="startup").start()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
 
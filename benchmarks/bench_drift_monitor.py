@@ -0,0 +1,33 @@
+"""输入漂移监控基准：单次observe()的开销，以及报告计算耗时
+
+运行方式（项目根目录）：python benchmarks/bench_drift_monitor.py
+"""
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drift_monitor import DriftMonitor, DriftReference  # noqa: E402
+
+FEATURES = ['AGE', 'INNET_DURA', 'PRI_PACKAGE_FEE', 'ACCT_BAL', 'N3M_AVG_DIS_ARPU',
+            'day_flux', 'night_flux', 'N3M_AVG_GAME_APP_USE_DAYS']
+CALLS = 200000
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    reference = DriftReference.from_matrix(FEATURES, rng.gamma(2.0, 10.0, (500000, len(FEATURES))))
+    monitor = DriftMonitor(FEATURES, window=10000)
+
+    features = [22.0, 12.0, 88.0, 50.0, 90.0, 5.2, 2.1, 5.0]
+    no_default = [False] * len(FEATURES)
+    with_default = [False, True, False, False, True, False, False, False]
+    for label, flags in [("无默认值填充", no_default), ("含默认值填充", with_default)]:
+        per_call = timeit.timeit(lambda: monitor.observe(features, flags), number=CALLS) / CALLS
+        print(f"observe（{label}）：{per_call * 1e6:.2f}µs/次")
+
+    start = time.perf_counter()
+    monitor.report(reference)
+    print(f"report（窗口{monitor.window}）：{(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,79 @@
+"""JSON序列化基准：逐单元格清洗+Flask默认DefaultJSONProvider vs 按列清洗+FastJSONProvider
+
+运行方式（项目根目录）：python benchmarks/bench_json_encoding.py [行数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, normalize_frame  # noqa: E402
+
+# 改造前app.py使用的序列化器：Flask默认提供器（非debug模式下紧凑输出；Flask 2.3+忽略JSON_AS_ASCII配置）
+legacy_json = DefaultJSONProvider(Flask("legacy"))
+
+
+def make_frame(rows):
+    """构造与wutong.csv字段结构相近的测试数据（含缺失值、中文、首尾空格）"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "USER_ID": [f"U{i:08d}" for i in range(rows)],
+        "PROV": rng.choice([" 北京 ", "上海", "广东", "四川"], rows),
+        "CITY": rng.choice(["北京", "上海", "广州", "深圳", "成都", None], rows),
+        "AGE": rng.integers(18, 36, rows),
+        "INNET_DURA": rng.integers(1, 120, rows),
+        "PRI_PACKAGE_FEE": rng.choice([29.0, 58.0, 88.0, 128.0, np.nan], rows),
+        "ACCT_BAL": rng.normal(50, 20, rows).round(2),
+        "day_flux": rng.gamma(2.0, 2.5, rows).round(3),
+        "night_flux": rng.gamma(1.5, 1.5, rows).round(3),
+        "N3M_AVG_GAME_APP_USE_DAYS": rng.integers(0, 31, rows),
+    })
+    return df
+
+
+def legacy_encode(df):
+    """改造前的实现：逐行逐列判断类型后交给标准json"""
+    records = []
+    for idx in range(len(df)):
+        row = {}
+        for col in df.columns:
+            val = df.iloc[idx][col]
+            if pd.isna(val):
+                row[col] = ""
+            elif isinstance(val, (int, float, np.integer, np.floating)):
+                row[col] = float(val) if isinstance(val, (float, np.floating)) else int(val)
+            else:
+                row[col] = str(val).strip()
+        records.append(row)
+    return legacy_json.dumps({"code": 200, "message": "success", "data": {"list": records}}).encode("utf-8")
+
+
+def fast_encode(df):
+    """改造后的实现：按列清洗 + FastJSONProvider"""
+    records = normalize_frame(df).to_dict("records")
+    return app.json.dumps({"code": 200, "message": "success", "data": {"list": records}}).encode("utf-8")
+
+
+def bench(func, df, repeat=5):
+    best, payload = float("inf"), b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, len(payload)
+
+
+if __name__ == "__main__":
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [100, 1000, 10000]
+    print(f"{'行数':>8} {'旧实现(ms)':>12} {'新实现(ms)':>12} {'加速比':>8} {'旧体积(B)':>12} {'新体积(B)':>12}")
+    for rows in sizes:
+        frame = make_frame(rows)
+        old_t, old_size = bench(legacy_encode, frame, repeat=3 if rows > 1000 else 5)
+        new_t, new_size = bench(fast_encode, frame)
+        print(f"{rows:>8} {old_t * 1000:>12.2f} {new_t * 1000:>12.2f} {old_t / new_t:>8.1f}x "
+              f"{old_size:>12} {new_size:>12}")
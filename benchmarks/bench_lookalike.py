@@ -0,0 +1,84 @@
+"""相似用户检索基准：100万用户 × 8维标准化特征的索引构建、增量更新与查询延迟
+
+运行方式（项目根目录）：python benchmarks/bench_lookalike.py [用户数，默认1000000]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lookalike import LookalikeIndex  # noqa: E402
+
+FEATURES = 8
+QUERIES = 50
+
+
+def make_users(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # 与CSV一致，用户ID不按字典序排列
+    ids = np.array([f"U{i:08d}" for i in rng.permutation(n)])
+    raw = np.column_stack([
+        rng.integers(18, 36, n),          # AGE
+        rng.integers(1, 120, n),          # INNET_DURA
+        rng.choice([29, 58, 88, 128, 256], n),  # PRI_PACKAGE_FEE
+        rng.normal(50, 20, n),            # ACCT_BAL
+        rng.gamma(4, 25, n),              # N3M_AVG_DIS_ARPU
+        rng.gamma(2, 2.5, n),             # day_flux
+        rng.gamma(1.5, 1.5, n),           # night_flux
+        rng.integers(0, 31, n),           # N3M_AVG_GAME_APP_USE_DAYS
+    ]).astype(np.float64)
+    groups = rng.integers(0, 6, n)
+    return ids, raw, groups
+
+
+def percentile_ms(samples, q):
+    return np.percentile(np.asarray(samples) * 1000, q)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ids, raw, groups = make_users(n)
+    mean, std = raw.mean(axis=0), raw.std(axis=0)
+
+    def transform(x):
+        """等价于StandardScaler.transform"""
+        return (x - mean) / std
+
+    start = time.perf_counter()
+    index = LookalikeIndex.build(ids, raw, transform, groups)
+    print(f"构建索引：{n}名用户，{(time.perf_counter() - start) * 1000:.0f}ms，"
+          f"向量内存{index.vectors.nbytes / 1024 / 1024:.1f}MB")
+
+    # 1%用户特征变化后的增量更新（ID序列不变，按行比较）
+    changed_raw = raw.copy()
+    changed_rows = np.random.default_rng(1).choice(n, n // 100, replace=False)
+    changed_raw[changed_rows, 5] += 1.0
+    start = time.perf_counter()
+    index, stats = index.update(ids, changed_raw, transform, groups)
+    print(f"增量更新：{stats}，{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # 末尾追加1%新用户（最常见的数据变化）：原有行复用，只标准化新增行
+    extra = n // 100
+    new_ids = np.array([f"N{i:08d}" for i in range(extra)])
+    grown_ids, grown_raw = np.append(ids, new_ids), np.vstack([changed_raw, make_users(extra, seed=3)[1]])
+    start = time.perf_counter()
+    grown, stats = index.update(grown_ids, grown_raw, transform, np.append(groups, groups[:extra]))
+    print(f"追加新用户后更新：{stats}，{(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # 删除用户后ID序列不再以原序列为前缀，update退回全量构建
+    start = time.perf_counter()
+    shrunk, stats = index.update(ids[1:], changed_raw[1:], transform, groups[1:])
+    print(f"删除用户后更新：{stats}，{(time.perf_counter() - start) * 1000:.0f}ms")
+    del grown, shrunk
+
+    rng = np.random.default_rng(2)
+    for label, kwargs in [("top500", {"k": 500}), ("top500+客群过滤", {"k": 500, "group": 3}),
+                          ("top50", {"k": 50})]:
+        samples = []
+        for row in rng.choice(n, QUERIES, replace=False):
+            start = time.perf_counter()
+            index.search(index.vectors[row], exclude=int(row), **kwargs)
+            samples.append(time.perf_counter() - start)
+        print(f"查询{label}：p50 {percentile_ms(samples, 50):.1f}ms，p95 {percentile_ms(samples, 95):.1f}ms")
@@ -0,0 +1,30 @@
+"""启动耗时回归检查：time-to-first-request（导入app + 首个 / 请求）超过上限时以非0退出
+
+运行方式（项目根目录）：python benchmarks/bench_startup.py [上限毫秒，默认1500]
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import collect_startup_profile  # noqa: E402
+
+DEFAULT_LIMIT_MS = 1500
+
+if __name__ == "__main__":
+    limit_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_LIMIT_MS
+    profile = collect_startup_profile(top_n=10)
+    print(json.dumps(profile, ensure_ascii=False, indent=2))
+    ttfr = profile.get("time_to_first_request_ms")
+    if ttfr is None:
+        print("❌ 未获取到启动耗时（子进程异常）")
+        sys.exit(2)
+    # 懒加载约束：仅服务 / 时不应导入pandas/sklearn，也不应反序列化模型
+    eager = [key for key in ("import_pandas_ms", "model_load_ms") if key in profile.get("first_request_timings", {})]
+    if eager:
+        print(f"❌ 首个请求前已触发重量级加载：{eager}")
+        sys.exit(1)
+    if ttfr > limit_ms:
+        print(f"❌ time-to-first-request {ttfr}ms 超过上限 {limit_ms}ms")
+        sys.exit(1)
+    print(f"✅ time-to-first-request {ttfr}ms（上限 {limit_ms}ms）")
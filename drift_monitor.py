@@ -0,0 +1,120 @@
+"""预测接口输入漂移监控：环形缓冲区记录最近的请求特征，与参考数据分布对比计算PSI/KS
+
+observe() 在请求路径上调用，只做定长列表写入和计数增减（纯Python，无NumPy开销），
+内存占用固定为 window × 特征数；直方图、PSI、KS 在读取报告时才计算。
+"""
+import threading
+
+PSI_EPS = 1e-4
+NAN = float("nan")
+# PSI分级：<0.1 稳定，0.1-0.25 轻微漂移，≥0.25 显著漂移
+PSI_LEVELS = [(0.1, "稳定"), (0.25, "轻微漂移"), (float("inf"), "显著漂移")]
+
+
+class DriftReference:
+    """参考分布：按参考数据分位数切分的分箱边界及各箱占比"""
+
+    def __init__(self, feature_names, edges, proportions, means):
+        self.feature_names = list(feature_names)
+        self.edges = edges
+        self.proportions = proportions
+        self.means = means
+
+    @classmethod
+    def from_matrix(cls, feature_names, matrix, bins=20):
+        import numpy as np
+        edges, proportions, means = [], [], []
+        for j in range(matrix.shape[1]):
+            column = matrix[:, j]
+            column = column[np.isfinite(column)]
+            # 内部边界取参考数据的等频分位点（去重后适配离散特征）
+            inner = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1])) if len(column) else np.empty(0)
+            counts = np.bincount(np.searchsorted(inner, column, side="right"), minlength=len(inner) + 1)
+            edges.append(inner)
+            proportions.append(counts / max(counts.sum(), 1))
+            means.append(float(column.mean()) if len(column) else 0.0)
+        return cls(feature_names, edges, proportions, means)
+
+
+class DriftMonitor:
+    """定长环形缓冲区：保存最近window次请求的特征值及默认值填充标记"""
+
+    def __init__(self, feature_names, window=10000):
+        self.feature_names = list(feature_names)
+        self.window = window
+        self._values = [None] * window
+        self._default_masks = [0] * window
+        self._default_counts = [0] * len(self.feature_names)
+        self._pos = 0
+        self._filled = 0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, features, defaulted=()):
+        """记录一次请求：features按feature_names顺序；defaulted为各特征是否使用了默认值
+        使用默认值的特征记为NaN：只计入默认值填充率，不参与PSI/KS（否则默认值本身会被当作漂移）
+        """
+        mask = 0
+        for i, flag in enumerate(defaulted):
+            if flag:
+                mask |= 1 << i
+        values = tuple(features)
+        if mask:
+            values = tuple(NAN if mask & (1 << i) else value for i, value in enumerate(values))
+        with self._lock:
+            pos = self._pos
+            old_mask = self._default_masks[pos]
+            if old_mask or mask:
+                counts = self._default_counts
+                for i in range(len(counts)):
+                    bit = 1 << i
+                    if old_mask & bit:
+                        counts[i] -= 1
+                    if mask & bit:
+                        counts[i] += 1
+            self._values[pos] = values
+            self._default_masks[pos] = mask
+            self._pos = (pos + 1) % self.window
+            if self._filled < self.window:
+                self._filled += 1
+            self._total += 1
+
+    def snapshot(self):
+        """复制当前窗口（加锁时间只包含列表切片）"""
+        with self._lock:
+            return self._values[:self._filled], list(self._default_counts), self._filled, self._total
+
+    def report(self, reference):
+        """对比窗口数据与参考分布，返回各特征的PSI、KS（分箱近似）和默认值填充率"""
+        import numpy as np
+        values, default_counts, filled, total = self.snapshot()
+        result = {"window": self.window, "observed": filled, "total_requests": total, "features": {}}
+        if not filled:
+            return result
+        matrix = np.asarray(values, dtype=np.float64)
+        for j, feat in enumerate(self.feature_names):
+            column = matrix[:, j]
+            finite = column[np.isfinite(column)]  # 使用默认值的请求记为NaN，不参与分布比较
+            entry = {
+                "default_fill_rate": round(default_counts[j] / filled, 4),
+                "window_mean": round(float(finite.mean()), 4) if len(finite) else None
+            }
+            if reference is not None and not len(finite):
+                # 窗口内该特征全部使用默认值，没有可比较的真实输入
+                entry.update({"psi": None, "ks": None, "level": "无有效样本",
+                              "reference_mean": round(reference.means[j], 4)})
+            elif reference is not None:
+                edges, expected = reference.edges[j], reference.proportions[j]
+                counts = np.bincount(np.searchsorted(edges, finite, side="right"), minlength=len(edges) + 1)
+                actual = counts / max(counts.sum(), 1)
+                exp_c, act_c = np.clip(expected, PSI_EPS, None), np.clip(actual, PSI_EPS, None)
+                psi = float(np.sum((act_c - exp_c) * np.log(act_c / exp_c)))
+                ks = float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+                entry.update({
+                    "psi": round(psi, 4),
+                    "ks": round(ks, 4),
+                    "level": next(name for bound, name in PSI_LEVELS if psi < bound),
+                    "reference_mean": round(reference.means[j], 4)
+                })
+            result["features"][feat] = entry
+        return result
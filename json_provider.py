@@ -0,0 +1,74 @@
+"""Flask JSON序列化提供器（orjson加速，原生支持NumPy/pandas标量）"""
+import datetime
+import decimal
+import math
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时退回Flask默认实现
+    orjson = None
+
+
+def _default(obj):
+    """处理orjson/json无法直接序列化的对象（不主动导入pandas/NumPy）"""
+    # pandas缺失值标记（pd.NA / pd.NaT）；NaT带有isoformat，必须先于日期分支判断
+    if type(obj).__name__ in ("NAType", "NaTType"):
+        return None
+    # NumPy datetime64（标量/数组）：.item()会得到纳秒整数，先转为微秒精度的datetime，与orjson输出的ISO字符串一致
+    if getattr(getattr(obj, "dtype", None), "kind", None) == "M":
+        val = obj.astype("datetime64[us]").tolist()
+        return val.isoformat() if isinstance(val, datetime.datetime) else val
+    # NumPy/pandas标量（np.int64、np.float64、np.bool_等）
+    if hasattr(obj, "item") and getattr(obj, "ndim", 0) == 0:
+        val = obj.item()
+        # 与pd.isna语义保持一致：NaN/NaT一律输出为null
+        if isinstance(val, float) and not math.isfinite(val):
+            return None
+        return val
+    # NumPy数组、pandas Series/Index
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    # pd.Timestamp / datetime / date
+    if isinstance(obj, (datetime.date, datetime.datetime)) or hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite_or_null(obj):
+    """标准json会把NaN/Infinity原样输出，这里与orjson保持一致：非有限浮点数输出为null"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite_or_null(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite_or_null(v) for v in obj]
+    return obj
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """基于orjson的JSON提供器，输出UTF-8原文（等价于JSON_AS_ASCII=False）"""
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", lambda o: _finite_or_null(_default(o)))
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            kwargs.setdefault("separators", (",", ":"))
+            return super().dumps(_finite_or_null(obj), **kwargs)
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,105 @@
+"""相似用户（Lookalike）检索：在标准化后的模型特征向量上做分块暴力最近邻搜索"""
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 65536
+
+
+class LookalikeIndex:
+    """全量用户的标准化特征索引（构建后只读，更新时生成新索引以便无锁替换）
+
+    - ids：用户ID（字符串数组）
+    - raw：原始特征矩阵（用于增量更新时判断哪些用户特征发生变化）
+    - vectors：标准化后的特征向量（float32，节省内存并加快矩阵乘）
+    - sq_norms：各向量的平方范数（欧氏距离 = |v|² - 2v·q + |q|²）
+    - groups：预测客群编码（可选，用于按客群过滤）
+    - transform：构建索引使用的标准化函数（查询特征须用同一函数标准化）
+    """
+
+    def __init__(self, ids, raw, vectors, groups=None, transform=None, id_sorter=None):
+        self.ids = ids
+        self.raw = raw
+        self.vectors = vectors
+        self.sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+        self.groups = groups
+        self.transform = transform
+        # 按ID排序的行号（position()二分查找用）；ID序列不变时可直接复用
+        self._id_sorter = np.argsort(ids, kind="stable") if id_sorter is None else id_sorter
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, raw, transform, groups=None):
+        """transform：原始特征 → 标准化特征（一般为scaler.transform）"""
+        ids = np.asarray(ids).astype(str)
+        vectors = np.ascontiguousarray(transform(raw), dtype=np.float32)
+        return cls(ids, raw, vectors, None if groups is None else np.asarray(groups), transform)
+
+    def update(self, ids, raw, transform, groups=None):
+        """增量重建：新ID序列以当前索引的ID序列为前缀时（原有行不变、新用户追加在末尾），
+        原有行按行号比较原始特征，只对变化的行和新增的行做标准化，ID排序结果也在原有基础上合并；
+        ID序列不满足该条件（删除用户或行序变化）时全量构建。
+        按ID逐个匹配旧行（字符串排序+二分查找）的开销高于一次标准化，因此不走该路径。
+
+        返回 (新索引, {"reused": 复用数, "transformed": 重新计算数, "rebuilt": 是否全量构建})
+        """
+        ids = np.asarray(ids).astype(str, copy=False)
+        n_old = len(self.ids)
+        if (len(ids) < n_old or raw.shape[1:] != self.raw.shape[1:]
+                or not np.array_equal(ids[:n_old], self.ids)):
+            index = LookalikeIndex.build(ids, raw, transform, groups)
+            return index, {"reused": 0, "transformed": len(ids), "rebuilt": True}
+        changed = np.flatnonzero(np.any(raw[:n_old] != self.raw, axis=1))
+        rows = np.concatenate([changed, np.arange(n_old, len(ids))])
+        vectors = self.vectors
+        if len(rows):
+            vectors = np.empty((len(ids), self.vectors.shape[1]), dtype=np.float32)
+            vectors[:n_old] = self.vectors
+            vectors[rows] = transform(raw[rows])
+        id_sorter = self._id_sorter
+        if len(ids) > n_old:
+            # 新增ID排序后按二分位置插入已有的排序结果，避免对全部ID重新排序
+            tail = n_old + np.argsort(ids[n_old:], kind="stable")
+            id_sorter = np.insert(id_sorter, np.searchsorted(self.ids[id_sorter], ids[tail], side="right"), tail)
+        index = LookalikeIndex(ids, raw, vectors, None if groups is None else np.asarray(groups), transform,
+                               id_sorter=id_sorter)
+        return index, {"reused": len(ids) - len(rows), "transformed": len(rows), "rebuilt": False}
+
+    def position(self, user_id):
+        """按USER_ID查找行号，不存在时返回None"""
+        user_id = str(user_id)
+        pos = np.searchsorted(self.ids, user_id, sorter=self._id_sorter)
+        if pos < len(self.ids) and self.ids[self._id_sorter[pos]] == user_id:
+            return int(self._id_sorter[pos])
+        return None
+
+    def search(self, query, k=500, group=None, exclude=None, block_size=DEFAULT_BLOCK_SIZE):
+        """返回与query（标准化后的特征向量）最相似的k个用户：[(行号, 距离), ...]，按距离升序
+
+        group：只在该预测客群内检索；exclude：需要排除的行号（如查询用户自身）
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query_norm = float(query @ query)
+        k = max(1, min(int(k), len(self.ids)))
+        best_dist = np.empty(0, dtype=np.float32)
+        best_idx = np.empty(0, dtype=np.int64)
+        for start in range(0, len(self.ids), block_size):
+            end = min(start + block_size, len(self.ids))
+            dist = self.sq_norms[start:end] - 2 * (self.vectors[start:end] @ query) + query_norm
+            if group is not None and self.groups is not None:
+                dist = np.where(self.groups[start:end] == group, dist, np.inf)
+            if exclude is not None and start <= exclude < end:
+                dist[exclude - start] = np.inf
+            take = min(k, len(dist))
+            local = np.argpartition(dist, take - 1)[:take]
+            cand_dist = np.concatenate([best_dist, dist[local]])
+            cand_idx = np.concatenate([best_idx, local + start])
+            if len(cand_dist) > k:
+                keep = np.argpartition(cand_dist, k - 1)[:k]
+                cand_dist, cand_idx = cand_dist[keep], cand_idx[keep]
+            best_dist, best_idx = cand_dist, cand_idx
+        order = np.argsort(best_dist, kind="stable")
+        best_dist, best_idx = best_dist[order], best_idx[order]
+        valid = np.isfinite(best_dist)
+        # 浮点误差可能产生极小的负数，截断为0后再开方
+        return list(zip(best_idx[valid].tolist(), np.sqrt(np.maximum(best_dist[valid], 0)).tolist()))
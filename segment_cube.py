@@ -0,0 +1,94 @@
+"""多维客群立方体：预计算各维度组合的计数/求和，切片与下钻查询无需重新扫描明细行"""
+import numpy as np
+
+
+class SegmentCube:
+    """稀疏存储的多维汇总立方体
+
+    只保存实际出现过的维度组合（COO格式）：
+    - cell_codes：每个单元格在各维度上的编码，形状 (单元格数, 维度数)
+    - counts：每个单元格的用户数
+    - sums：每个度量在每个单元格上的求和
+    """
+
+    def __init__(self, dims, labels, cell_codes, counts, sums):
+        self.dims = list(dims)
+        self.labels = labels
+        self.cell_codes = cell_codes
+        self.counts = counts
+        self.sums = sums
+        self._label_index = {dim: {label: i for i, label in enumerate(labels[dim])} for dim in self.dims}
+
+    @classmethod
+    def build(cls, dims, measures=None):
+        """dims：{维度名: 长度相同的标签数组}；measures：{度量名: 数值数组（已填充缺失值）}"""
+        measures = measures or {}
+        names = list(dims)
+        codes, labels = [], {}
+        for name in names:
+            uniques, inverse = np.unique(np.asarray(dims[name]).astype(str), return_inverse=True)
+            labels[name] = uniques.tolist()
+            codes.append(inverse.ravel())
+        shape = tuple(max(len(labels[name]), 1) for name in names)
+        flat = np.ravel_multi_index(codes, shape)
+        cells, inverse = np.unique(flat, return_inverse=True)
+        cell_codes = np.stack(np.unravel_index(cells, shape), axis=1).astype(np.int32)
+        counts = np.bincount(inverse, minlength=len(cells)).astype(np.int64)
+        sums = {name: np.bincount(inverse, weights=np.asarray(values, dtype=np.float64), minlength=len(cells))
+                for name, values in measures.items()}
+        return cls(names, labels, cell_codes, counts, sums)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def describe(self):
+        """维度及可选取值（供前端构建筛选项）"""
+        return {
+            "dimensions": {dim: self.labels[dim] for dim in self.dims},
+            "measures": list(self.sums),
+            "cells": int(len(self.counts)),
+            "total": self.total
+        }
+
+    def query(self, filters=None, group_by=None, limit=None):
+        """按filters（{维度: [取值,...]}）过滤后按group_by聚合，结果按用户数降序"""
+        filters = filters or {}
+        group_by = [dim for dim in (group_by or []) if dim in self.dims]
+        mask = np.ones(len(self.counts), dtype=bool)
+        for dim, values in filters.items():
+            if dim not in self.dims:
+                raise KeyError(f"未知维度：{dim}")
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            allowed = [self._label_index[dim][str(v)] for v in values if str(v) in self._label_index[dim]]
+            mask &= np.isin(self.cell_codes[:, self.dims.index(dim)], allowed)
+
+        counts = self.counts[mask]
+        sums = {name: values[mask] for name, values in self.sums.items()}
+        if group_by:
+            cols = [self.dims.index(dim) for dim in group_by]
+            sub_codes = self.cell_codes[mask][:, cols]
+            shape = tuple(max(len(self.labels[dim]), 1) for dim in group_by)
+            groups, inverse = np.unique(np.ravel_multi_index(tuple(sub_codes.T), shape), return_inverse=True)
+            inverse = inverse.ravel()
+            group_codes = np.stack(np.unravel_index(groups, shape), axis=1)
+            counts = np.bincount(inverse, weights=counts, minlength=len(groups)).astype(np.int64)
+            sums = {name: np.bincount(inverse, weights=values, minlength=len(groups)) for name, values in sums.items()}
+        else:
+            group_codes = np.zeros((1, 0), dtype=np.int32)
+            counts = np.array([counts.sum()], dtype=np.int64)
+            sums = {name: np.array([values.sum()]) for name, values in sums.items()}
+
+        order = np.argsort(-counts, kind="stable")
+        if limit:
+            order = order[:int(limit)]
+        rows = []
+        for i in order:
+            count = int(counts[i])
+            row = {dim: self.labels[dim][group_codes[i][j]] for j, dim in enumerate(group_by)}
+            row["count"] = count
+            for name, values in sums.items():
+                row[f"avg_{name}"] = round(float(values[i]) / count, 2) if count else 0
+            rows.append(row)
+        return rows
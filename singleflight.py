@@ -0,0 +1,98 @@
+"""按版本缓存的单飞（single-flight）重建：同一时刻只有一次重建，旧版本数据在后台刷新期间继续提供服务"""
+import threading
+import time
+
+# 重建失败后的冷却时间（秒）：期间不再重试，避免每个请求都触发一次注定失败的重建
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class _Flight:
+    """一次进行中的重建，其他调用方等待done事件后共享结果"""
+
+    def __init__(self, version):
+        self.version = version
+        self.started_at = time.monotonic()
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class VersionedCache:
+    """按版本缓存昂贵的构建结果
+
+    - version_fn()：返回当前版本（如数据文件修改时间+大小），返回None表示无数据
+    - builder(version, previous)：构建该版本的结果，previous为上一版本的结果（可用于增量更新）
+    - get(allow_stale=True)：版本变化且已有旧结果时立即返回旧结果，并在后台线程中重建（stale-while-revalidate）；
+      allow_stale=False 或尚无旧结果时，等待重建完成并共享结果
+    - 任意时刻最多只有一次重建：重建进行中版本再次变化（如CSV正在被写入）时不另起重建，
+      等这次完成后由下一次get()重新比较版本；重建失败后retry_after秒内不重试
+    """
+
+    def __init__(self, name, builder, version_fn, retry_after=DEFAULT_RETRY_AFTER):
+        self.name = name
+        self._builder = builder
+        self._version_fn = version_fn
+        self._retry_after = retry_after
+        self._lock = threading.Lock()
+        self._version = None
+        self._value = None
+        self._has_value = False
+        self._flight = None
+        self._last_error = None
+        self._failed_at = None
+
+    def get(self, allow_stale=True):
+        called_at = time.monotonic()
+        while True:
+            version = self._version_fn()
+            if version is None:
+                return None
+            with self._lock:
+                if self._has_value and self._version == version:
+                    return self._value
+                serve_stale = allow_stale and self._has_value
+                previous = self._value
+                flight = self._flight
+                leader = False
+                if flight is None:
+                    if self._failed_at is not None and time.monotonic() - self._failed_at < self._retry_after:
+                        # 冷却期内：有旧结果则继续使用，否则直接抛出上次的错误
+                        if serve_stale:
+                            return previous
+                        raise self._last_error
+                    flight = self._flight = _Flight(version)
+                    leader = True
+            if leader:
+                if serve_stale:
+                    threading.Thread(target=self._run, args=(flight, previous), daemon=True,
+                                     name=f"refresh-{self.name}").start()
+                    return previous
+                self._run(flight, previous)
+            elif serve_stale:
+                return previous
+            flight.done.wait()
+            # 自己发起的重建、所需版本的重建、或本次调用之后才开始的重建（版本不旧于调用时）：直接使用其结果；
+            # 否则等到的是更早开始的旧版本重建，重新比较版本
+            if leader or flight.version == version or flight.started_at >= called_at:
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+
+    def _run(self, flight, previous):
+        start = time.perf_counter()
+        try:
+            flight.value = self._builder(flight.version, previous)
+            with self._lock:
+                self._version, self._value, self._has_value = flight.version, flight.value, True
+                self._last_error, self._failed_at = None, None
+            print(f"✅ {self.name} 重建完成，耗时{(time.perf_counter() - start) * 1000:.0f}ms")
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._last_error, self._failed_at = e, time.monotonic()
+            print(f"❌ {self.name} 重建失败：{str(e)[:100]}")
+        finally:
+            with self._lock:
+                if self._flight is flight:
+                    self._flight = None
+            flight.done.set()
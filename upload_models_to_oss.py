@@ -1,58 +1,263 @@
 # 1. 导入必要的库
-import oss2  # 阿里云OSS SDK
 import os    # 用于处理文件路径
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
 from pathlib import Path  # 更安全的路径处理
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # -------------------------- 2. 配置信息（必须替换成你的！） --------------------------
-# 阿里云OSS凭证
-ACCESS_KEY_ID = "LTAI5t86RbFrzzyTUnqussE3"       # 替换：步骤2.4获取的AccessKey ID
-ACCESS_KEY_SECRET = "HAunjuGb98whAmvzx2AX34pvmPeBxO" # 替换：步骤2.4获取的AccessKey Secret
-ENDPOINT = "oss-cn-beijing.aliyuncs.com" # 替换：步骤2.3获取的Endpoint
-BUCKET_NAME = "zshidai"          # 替换：步骤2.2创建的Bucket名称
+# 阿里云OSS凭证（只从环境变量读取，禁止写入代码仓库）
+ACCESS_KEY_ID = os.environ.get("OSS_ACCESS_KEY_ID", "")          # 步骤2.4获取的AccessKey ID
+ACCESS_KEY_SECRET = os.environ.get("OSS_ACCESS_KEY_SECRET", "")  # 步骤2.4获取的AccessKey Secret
+ENDPOINT = os.environ.get("OSS_ENDPOINT", "oss-cn-beijing.aliyuncs.com") # 替换：步骤2.3获取的Endpoint
+BUCKET_NAME = os.environ.get("OSS_BUCKET_NAME", "zshidai")          # 替换：步骤2.2创建的Bucket名称
 
 # 路径配置
 LOCAL_MODEL_DIR = "./model"  # 本地模型目录（你的项目中model文件夹的路径，无需修改）
 OSS_MODEL_DIR = "model/"     # OSS上的目标目录（保持和本地一致，方便后续查找）
+MANIFEST_NAME = "manifest.json"  # OSS上记录各模型文件sha256及对象键的清单（模型对象按内容寻址存放，清单是唯一的切换点）
+LOCAL_CACHE_DIR = "./model_cache"  # 本地内容寻址缓存目录（按sha256存放下载的模型）
+
+# 传输配置
+MULTIPART_THRESHOLD = 16 * 1024 * 1024  # 超过16MB的文件使用分片（断点续传）上传/下载
+PART_SIZE = 8 * 1024 * 1024             # 分片大小
+PART_THREADS = 4                        # 单个文件的分片并发数
+FILE_WORKERS = 4                        # 同时传输的文件数
+HASH_CHUNK = 4 * 1024 * 1024
 # -----------------------------------------------------------------------------------
 
 # 3. 初始化OSS客户端
 def init_oss_client():
     # 验证配置是否完整
-    if not all([ACCESS_KEY_ID, ACCESS_KEY_SECRET, ENDPOINT, BUCKET_NAME]):
+    if not ACCESS_KEY_ID or not ACCESS_KEY_SECRET:
+        raise ValueError("缺少OSS凭证：请设置环境变量OSS_ACCESS_KEY_ID和OSS_ACCESS_KEY_SECRET")
+    if not ENDPOINT or not BUCKET_NAME:
         raise ValueError("请先填写完整的OSS配置信息！")
+    import oss2  # 阿里云OSS SDK（仅在访问OSS时导入）
     # 创建OSS认证对象
     auth = oss2.Auth(ACCESS_KEY_ID, ACCESS_KEY_SECRET)
     # 连接到指定Bucket
     bucket = oss2.Bucket(auth, ENDPOINT, BUCKET_NAME)
     return bucket
 
-# 4. 批量上传模型文件
-def upload_models():
-    # 初始化OSS客户端
-    bucket = init_oss_client()
-    
+
+def file_sha256(file_path):
+    """分块计算文件sha256（大模型文件不整体读入内存）"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 4. 存储后端（OSS / 本地目录，本地目录用于测试或离线环境）
+class OssStore:
+    """阿里云OSS存储：大文件使用oss2断点续传（分片并发）"""
+
+    def __init__(self, bucket=None, checkpoint_dir=None):
+        # 先校验凭证再导入SDK，缺少环境变量时直接给出明确错误
+        self.bucket = bucket or init_oss_client()
+        import oss2
+        self.oss2 = oss2
+        # 断点续传的checkpoint目录（中断后重新执行会从已完成的分片继续）
+        self.checkpoint_store = oss2.ResumableStore(root=checkpoint_dir or tempfile.gettempdir())
+        self.download_checkpoint_store = oss2.ResumableDownloadStore(root=checkpoint_dir or tempfile.gettempdir())
+
+    def read_manifest(self):
+        key = OSS_MODEL_DIR + MANIFEST_NAME
+        if not self.bucket.object_exists(key):
+            return {}
+        return json.loads(self.bucket.get_object(key).read().decode("utf-8"))
+
+    def write_manifest(self, manifest):
+        data = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8")
+        self.bucket.put_object(OSS_MODEL_DIR + MANIFEST_NAME, data)
+
+    def upload(self, local_path, name):
+        self.oss2.resumable_upload(
+            self.bucket, OSS_MODEL_DIR + name, str(local_path),
+            store=self.checkpoint_store,
+            multipart_threshold=MULTIPART_THRESHOLD,
+            part_size=PART_SIZE,
+            num_threads=PART_THREADS
+        )
+
+    def download(self, name, local_path):
+        self.oss2.resumable_download(
+            self.bucket, OSS_MODEL_DIR + name, str(local_path),
+            store=self.download_checkpoint_store,
+            multiget_threshold=MULTIPART_THRESHOLD,
+            part_size=PART_SIZE,
+            num_threads=PART_THREADS
+        )
+
+
+class LocalStore:
+    """本地目录模拟Bucket（目录结构与OSS一致：<root>/model/<文件名>）"""
+
+    def __init__(self, root):
+        self.root = Path(root) / OSS_MODEL_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def read_manifest(self):
+        path = self.root / MANIFEST_NAME
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def write_manifest(self, manifest):
+        _atomic_write_bytes(self.root / MANIFEST_NAME,
+                            json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8"))
+
+    def upload(self, local_path, name):
+        _atomic_copy(local_path, self.root / name)
+
+    def download(self, name, local_path):
+        _atomic_copy(self.root / name, local_path)
+
+
+def _atomic_copy(src, dst):
+    """先写临时文件再重命名，避免中断时留下半个文件"""
+    dst = Path(dst)
+    fd, tmp_path = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _atomic_write_bytes(dst, data):
+    dst = Path(dst)
+    fd, tmp_path = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dst)
+
+
+def get_store(source=None):
+    """source为空或"oss"时使用阿里云OSS，否则视为本地目录"""
+    if not source or source == "oss":
+        return OssStore()
+    return LocalStore(source)
+
+
+# 5. 批量上传模型文件（按sha256跳过未变化的文件，多文件并发上传）
+def remote_name_for(sha256):
+    """OSS上按内容寻址的对象名（model/<sha256>.pkl）：上传新版本不覆盖旧对象，下载方按清单读到的总是完整一致的版本"""
+    return f"{sha256}.pkl"
+
+
+def upload_models(store=None, local_model_dir=LOCAL_MODEL_DIR, workers=FILE_WORKERS):
+    # 初始化存储（默认OSS）
+    store = store or get_store()
+
     # 检查本地模型目录是否存在
-    local_model_path = Path(LOCAL_MODEL_DIR)
+    local_model_path = Path(local_model_dir)
     if not local_model_path.exists() or not local_model_path.is_dir():
-        print(f"❌ 本地模型目录不存在：{LOCAL_MODEL_DIR}")
-        return
-    
-    # 遍历本地model目录下的所有.pkl文件
-    for file_path in local_model_path.glob("*.pkl"):
-        # 获取文件名（如"zgen_preference_model.pkl"）
-        file_name = file_path.name
-        # 拼接OSS上的目标路径（如"model/zgen_preference_model.pkl"）
-        oss_target_path = os.path.join(OSS_MODEL_DIR, file_name)
-        
+        print(f"❌ 本地模型目录不存在：{local_model_dir}")
+        return {}
+
+    manifest = store.read_manifest()
+    # 遍历本地model目录下的所有.pkl文件，计算哈希并筛选出变化的文件
+    pending = []
+    for file_path in sorted(local_model_path.glob("*.pkl")):
+        sha256 = file_sha256(file_path)
+        if manifest.get(file_path.name, {}).get("sha256") == sha256:
+            print(f"⏭️ 未变化，跳过：{file_path.name}")
+            continue
+        pending.append((file_path, sha256))
+
+    uploaded = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(store.upload, file_path, remote_name_for(sha256)): (file_path, sha256)
+                   for file_path, sha256 in pending}
+        for future in as_completed(futures):
+            file_path, sha256 = futures[future]
+            try:
+                future.result()
+                uploaded[file_path.name] = {"sha256": sha256, "size": file_path.stat().st_size,
+                                            "key": remote_name_for(sha256)}
+                print(f"✅ 上传成功：{file_path} → {OSS_MODEL_DIR}{remote_name_for(sha256)}")
+            except Exception as e:
+                print(f"❌ 上传失败：{file_path}，错误：{str(e)}")
+
+    # 所有文件传输完成后再更新清单，保证清单只指向已上传完整的文件
+    if uploaded:
+        manifest.update(uploaded)
+        store.write_manifest(manifest)
+    return uploaded
+
+
+# 6. 下载模型到本地内容寻址缓存（<缓存目录>/<sha256前2位>/<sha256>.pkl）
+def cache_path_for(sha256, cache_dir=LOCAL_CACHE_DIR):
+    return Path(cache_dir) / sha256[:2] / f"{sha256}.pkl"
+
+
+def download_models(store=None, cache_dir=LOCAL_CACHE_DIR, workers=FILE_WORKERS):
+    """按清单下载模型，缓存中已有相同sha256的文件直接复用；返回{文件名: 本地缓存路径}"""
+    store = store or get_store()
+    manifest = store.read_manifest()
+    resolved, pending = {}, []
+    for name, meta in manifest.items():
+        target = cache_path_for(meta["sha256"], cache_dir)
+        if target.exists():
+            resolved[name] = str(target)
+        else:
+            # 旧版清单没有key字段，对象仍按文件名存放
+            pending.append((name, meta.get("key", name), meta["sha256"], target))
+
+    def fetch(name, key, sha256, target):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 临时文件名唯一：多个进程同时下载同一模型时互不覆盖，先完成校验的一方原子替换到缓存路径
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".part")
+        os.close(fd)
         try:
-            # 上传本地文件到OSS
-            bucket.put_object_from_file(oss_target_path, str(file_path))
-            print(f"✅ 上传成功：{file_path} → OSS路径：{oss_target_path}")
-        except Exception as e:
-            print(f"❌ 上传失败：{file_path}，错误：{str(e)}")
+            store.download(key, tmp_path)
+            # 校验内容哈希，防止缓存中混入损坏或被替换的文件
+            actual = file_sha256(tmp_path)
+            if actual != sha256:
+                raise ValueError(f"sha256不匹配（期望{sha256[:12]}，实际{actual[:12]}）")
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return str(target)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch, *item): item[0] for item in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                resolved[name] = future.result()
+                print(f"✅ 下载成功：{OSS_MODEL_DIR}{name} → {resolved[name]}")
+            except Exception as e:
+                print(f"❌ 下载失败：{name}，错误：{str(e)}")
+    return resolved
 
-# 5. 执行上传
+
+# 7. 执行同步
 if __name__ == "__main__":
-    print("开始批量上传模型文件到阿里云OSS...")
-    upload_models()
-    print("上传任务结束！")
+    parser = argparse.ArgumentParser(description="模型文件与OSS同步（按sha256增量上传/下载）")
+    parser.add_argument("action", nargs="?", choices=["upload", "download"], default="upload")
+    parser.add_argument("--store", default=None, help="oss（默认）或本地目录路径（测试用Bucket替身）")
+    parser.add_argument("--model-dir", default=LOCAL_MODEL_DIR)
+    parser.add_argument("--cache-dir", default=LOCAL_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=FILE_WORKERS)
+    args = parser.parse_args()
+
+    if args.action == "upload":
+        print("开始增量上传模型文件...")
+        result = upload_models(get_store(args.store), args.model_dir, args.workers)
+        print(f"上传任务结束！本次上传{len(result)}个文件")
+    else:
+        print("开始下载模型文件到本地缓存...")
+        result = download_models(get_store(args.store), args.cache_dir, args.workers)
+        print(f"下载任务结束！可用模型文件{len(result)}个")
+        sys.exit(0 if result else 1)